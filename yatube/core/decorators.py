@@ -0,0 +1,122 @@
+import hashlib
+import random
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.encoding import iri_to_uri
+
+from .routers import primary_reads, read_alias
+
+CACHED_HEADERS = ('Content-Type', 'Content-Language', 'Vary')
+
+
+def path_key(path):
+    """Ключ версии адреса: reverse() даёт путь в %-кодировке,
+    request.path — раскодированный, iri_to_uri приводит оба к одному."""
+    path = hashlib.md5(iri_to_uri(path).encode()).hexdigest()
+    return f'anon_path_version:{path}'
+
+
+def path_version(path):
+    key = path_key(path)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def page_key(path, query=''):
+    """Ключ гостевой страницы: адрес с запросом хешируется, чтобы ключ
+    не выходил за 250 символов memcached."""
+    url = hashlib.md5(f'{iri_to_uri(path)}?{query}'.encode()).hexdigest()
+    return f'anon_page:{path_version(path)}:{url}'
+
+
+def purge_paths(paths):
+    """Сбрасывает закешированные гостевые ответы по адресам paths."""
+    cache.delete_many([path_key(path) for path in paths])
+
+
+def is_anonymous_request(request):
+    return (
+        request.method in ('GET', 'HEAD')
+        and settings.SESSION_COOKIE_NAME not in request.COOKIES
+    )
+
+
+def is_cacheable_response(response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+    )
+
+
+def anonymous_page_cache(view):
+    """Кеширует ответ целиком для гостей без сессионной cookie.
+
+    Просроченный ответ ещё ANONYMOUS_CACHE_STALE секунд отдаётся
+    остальным запросам, пока один из них пересобирает страницу.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not is_anonymous_request(request):
+            return view(request, *args, **kwargs)
+        key = page_key(request.path, request.GET.urlencode())
+        lock_key = f'{key}:lock'
+        entry = cache.get(key)
+        if entry is not None:
+            fresh = entry['fresh_until'] > time.time()
+            if fresh or not cache.add(
+                lock_key, True, settings.ANONYMOUS_CACHE_LOCK_TIMEOUT
+            ):
+                response = HttpResponse(
+                    entry['content'], status=entry['status'])
+                for header, value in entry['headers'].items():
+                    response[header] = value
+                return response
+        # Ответ ляжет в кеш: отставшая реплика не должна попасть в него.
+        with primary_reads():
+            response = view(request, *args, **kwargs)
+        if is_cacheable_response(response):
+            timeout = (
+                settings.ANONYMOUS_CACHE_TIMEOUT
+                + settings.ANONYMOUS_CACHE_STALE
+            )
+            cache.set(key, {
+                'content': response.content,
+                'status': response.status_code,
+                'headers': {
+                    header: response[header]
+                    for header in CACHED_HEADERS if response.has_header(header)
+                },
+                'fresh_until': time.time() + settings.ANONYMOUS_CACHE_TIMEOUT,
+            }, timeout)
+        if entry is not None:
+            cache.delete(lock_key)
+        return response
+    return wrapper
+
+
+def replica_reads(view):
+    """Направляет чтения представления на случайную реплику.
+
+    Клиент, недавно выполнивший запись, закреплён за основной базой
+    cookie REPLICA_PIN_COOKIE и читает из неё свои изменения. Всё, что
+    кладётся в кеш, читается из основной базы (primary_reads).
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or settings.REPLICA_PIN_COOKIE in request.COOKIES:
+            return view(request, *args, **kwargs)
+        token = read_alias.set(random.choice(replicas))
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            read_alias.reset(token)
+    return wrapper
@@ -0,0 +1,114 @@
+"""Хранилище метаданных миниатюр sorl с локальным LRU перед кешем.
+
+Порядок чтения: LRU процесса, кеш THUMBNAIL_CACHE из CACHES, таблица
+sorl в базе. В LRU лежат уже разобранные значения (ImageFile и списки
+миниатюр), так что попадание в него обходится без JSON. Записи живут
+не дольше THUMBNAIL_LRU_TIMEOUT секунд, так что удаление миниатюры
+другим процессом видно через это время.
+Отсутствие ключа в LRU не запоминается: миниатюра, построенная
+фоновой задачей, должна появиться на следующем же рендере.
+"""
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from sorl.thumbnail.conf import settings
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+from sorl.thumbnail.kvstores.cached_db_kvstore import KVStore as DBKVStore
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+MISSING = object()
+
+
+class LRUCache:
+    """Потокобезопасный LRU с ограничением числа записей и их возраста."""
+
+    def __init__(self, maxsize, timeout):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return MISSING
+            expires, value = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return MISSING
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.timeout, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class KVStore(DBKVStore):
+    """KVStore для THUMBNAIL_KVSTORE: LRU, затем кеш, затем база.
+
+    Счётчики stats общие для процесса: попадания в LRU (local), в кеш
+    (cache), чтения из базы (db) и ключи, которых нет нигде (miss).
+    """
+    local = LRUCache(
+        settings.THUMBNAIL_LRU_SIZE, settings.THUMBNAIL_LRU_TIMEOUT)
+    stats = Counter()
+
+    def _get(self, key, identity='image'):
+        raw_key = add_prefix(key, identity)
+        value = self.local.get(raw_key)
+        if value is not MISSING:
+            self.stats['local'] += 1
+            return value
+        value = super()._get(key, identity)
+        if value is not None:
+            self.local.set(raw_key, value)
+        return value
+
+    def _get_raw(self, key):
+        value = self.cache.get(key)
+        if value is None:
+            value = KVStoreModel.objects.filter(key=key).values_list(
+                'value', flat=True).first()
+            self.stats['db' if value is not None else 'miss'] += 1
+            self.cache.set(
+                key,
+                EMPTY_VALUE if value is None else value,
+                settings.THUMBNAIL_CACHE_TIMEOUT,
+            )
+        elif value == EMPTY_VALUE:
+            self.stats['miss'] += 1
+            value = None
+        else:
+            self.stats['cache'] += 1
+        return value
+
+    def _set_raw(self, key, value):
+        super()._set_raw(key, value)
+        self.local.delete(key)
+
+    def _delete_raw(self, *keys):
+        super()._delete_raw(*keys)
+        for key in keys:
+            self.local.delete(key)
+
+    def clear(self, delete_thumbnails=False):
+        super().clear(delete_thumbnails)
+        self.local.clear()
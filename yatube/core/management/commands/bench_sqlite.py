@@ -0,0 +1,127 @@
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.db import pragma_statements
+
+SCHEMA = (
+    'CREATE TABLE post (id INTEGER PRIMARY KEY, author_id INTEGER, '
+    'text TEXT, pub_date REAL)',
+    'CREATE INDEX post_author_date ON post (author_id, pub_date DESC)',
+    'CREATE TABLE comment (id INTEGER PRIMARY KEY, post_id INTEGER, '
+    'text TEXT, created REAL)',
+    'CREATE INDEX comment_post_created ON comment (post_id, created DESC)',
+)
+AUTHORS = 100
+POSTS = 5000
+
+
+def connect(path, pragmas):
+    # Таймаут как у бэкенда Django по умолчанию.
+    connection = sqlite3.connect(path, timeout=5, check_same_thread=False)
+    for statement in pragma_statements(pragmas):
+        connection.execute(statement)
+    return connection
+
+
+def create_database(path, pragmas):
+    connection = connect(path, pragmas)
+    for statement in SCHEMA:
+        connection.execute(statement)
+    now = time.time()
+    connection.executemany(
+        'INSERT INTO post (author_id, text, pub_date) VALUES (?, ?, ?)',
+        (
+            (random.randrange(AUTHORS), 'текст поста ' * 20, now - i)
+            for i in range(POSTS)
+        ),
+    )
+    connection.commit()
+    connection.close()
+
+
+def read(connection):
+    connection.execute(
+        'SELECT p.id, p.text, COUNT(c.id) FROM post p '
+        'LEFT JOIN comment c ON c.post_id = p.id '
+        'WHERE p.author_id = ? GROUP BY p.id '
+        'ORDER BY p.pub_date DESC LIMIT 10',
+        (random.randrange(AUTHORS),),
+    ).fetchall()
+
+
+def write(connection):
+    connection.execute(
+        'INSERT INTO comment (post_id, text, created) VALUES (?, ?, ?)',
+        (random.randrange(1, POSTS), 'комментарий', time.time()),
+    )
+    connection.commit()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность SQLite при смешанной нагрузке '
+        'с настройками по умолчанию и с профилем SQLITE_PRAGMAS'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--writers', type=int, default=2)
+
+    def run(self, pragmas, options):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bench.sqlite3')
+            create_database(path, pragmas)
+            stop = time.monotonic() + options['seconds']
+            stats = {'read': 0, 'write': 0, 'locked': 0}
+            lock = threading.Lock()
+
+            def worker(operation, name):
+                connection = connect(path, pragmas)
+                done = locked = 0
+                while time.monotonic() < stop:
+                    try:
+                        operation(connection)
+                        done += 1
+                    except sqlite3.OperationalError:
+                        connection.rollback()
+                        locked += 1
+                connection.close()
+                with lock:
+                    stats[name] += done
+                    stats['locked'] += locked
+
+            threads = [
+                threading.Thread(target=worker, args=(read, 'read'))
+                for _ in range(options['readers'])
+            ] + [
+                threading.Thread(target=worker, args=(write, 'write'))
+                for _ in range(options['writers'])
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        stats['read'] /= options['seconds']
+        stats['write'] /= options['seconds']
+        return stats
+
+    def handle(self, *args, **options):
+        profiles = (
+            ('по умолчанию', {}),
+            ('SQLITE_PRAGMAS', settings.SQLITE_PRAGMAS),
+        )
+        for title, pragmas in profiles:
+            result = self.run(pragmas, options)
+            self.stdout.write(
+                f'{title}: чтений {result["read"]:.0f}/с, '
+                f'записей {result["write"]:.0f}/с, '
+                f'ошибок блокировки {result["locked"]}'
+            )
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+
+class Command(BaseCommand):
+    help = (
+        'Обновляет статистику планировщика SQLite и сбрасывает WAL. '
+        'Запускается периодически, например раз в час из cron.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--analyze',
+            action='store_true',
+            help='Полный ANALYZE вместо PRAGMA optimize',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            self.stdout.write('База не SQLite, пропускаем')
+            return
+        with connection.cursor() as cursor:
+            if options['analyze']:
+                cursor.execute('ANALYZE')
+            else:
+                cursor.execute('PRAGMA optimize')
+            cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            _, _, checkpointed = cursor.fetchone()
+        self.stdout.write(
+            f'Статистика обновлена, страниц WAL перенесено: {checkpointed}')
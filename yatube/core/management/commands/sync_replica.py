@@ -0,0 +1,48 @@
+import sqlite3
+import time
+from contextlib import closing
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+def copy_database(source, target):
+    """Переносит согласованный снимок базы SQLite через backup API."""
+    with closing(sqlite3.connect(source)) as src:
+        with closing(sqlite3.connect(target)) as dst:
+            src.backup(dst)
+
+
+class Command(BaseCommand):
+    help = (
+        'Заменяет репликацию при локальной разработке: копирует основную '
+        'базу SQLite в файлы реплик из DATABASE_REPLICAS'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            help='Повторять копирование каждые INTERVAL секунд',
+        )
+
+    def sqlite_path(self, alias):
+        settings_dict = connections[alias].settings_dict
+        if settings_dict['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError(f'База {alias} не SQLite')
+        return settings_dict['NAME']
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('DATABASE_REPLICAS пуст')
+        source = self.sqlite_path(DEFAULT_DB_ALIAS)
+        targets = [
+            self.sqlite_path(alias) for alias in settings.DATABASE_REPLICAS]
+        while True:
+            for target in targets:
+                copy_database(source, target)
+            self.stdout.write(f'Реплик синхронизировано: {len(targets)}')
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,161 @@
+"""Раздача MEDIA без DEBUG.
+
+Режим задаёт MEDIA_SERVE:
+
+* None — MEDIA_URL целиком отдаёт веб-сервер, Django адрес не слушает;
+* 'x-accel-redirect' (nginx) и 'x-sendfile' (Apache, lighttpd) — Django
+  проверяет путь и ставит заголовок, файл отдаёт сервер сам, с Range
+  и условными запросами;
+* 'stream' — файл отдаёт Django: целиком через FileResponse (WSGI-сервер
+  с wsgi.file_wrapper передаёт его через sendfile), фрагменты Range —
+  кусками из mmap.
+
+Файлы под MEDIA_IMMUTABLE_PREFIXES кешируются клиентами навсегда: имя
+миниатюры зависит от содержимого исходника и её параметров.
+"""
+import mimetypes
+import mmap
+import os
+import re
+from urllib.parse import quote, urlparse
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (FileResponse, Http404, HttpResponse,
+                         StreamingHttpResponse)
+from django.urls import re_path
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 2 ** 10
+
+
+def media_path(path):
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+    return full_path
+
+
+def cache_headers(response, path):
+    if path.startswith(tuple(settings.MEDIA_IMMUTABLE_PREFIXES)):
+        patch_cache_control(
+            response, public=True, max_age=365 * 24 * 60 * 60,
+            immutable=True)
+    else:
+        patch_cache_control(
+            response, public=True, max_age=settings.MEDIA_MAX_AGE)
+    return response
+
+
+def offload(path, full_path):
+    """Ответ без тела: файл отдаст веб-сервер по заголовку."""
+    response = HttpResponse()
+    del response['Content-Type']
+    if settings.MEDIA_SERVE == 'x-accel-redirect':
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX + quote(
+            path)
+    else:
+        response['X-Sendfile'] = full_path
+    return response
+
+
+def parse_range(header, size):
+    """(start, stop) одного диапазона Range; None — отдать файл целиком,
+    ValueError — диапазон вне файла. Несколько диапазонов сразу
+    не поддерживаются: по RFC 7233 сервер вправе их игнорировать."""
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        if last and int(last) < start:
+            return None
+        stop = min(int(last) + 1, size) if last else size
+    else:
+        start, stop = max(size - int(last), 0), size
+    if start >= stop:
+        raise ValueError
+    return start, stop
+
+
+def mapped_range(full_path, start, stop):
+    with open(full_path, 'rb') as file, mmap.mmap(
+            file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        for offset in range(start, stop, CHUNK_SIZE):
+            yield mapped[offset:min(offset + CHUNK_SIZE, stop)]
+
+
+def range_matches(request, etag, last_modified):
+    """If-Range: фрагмент отдаётся, только если файл не менялся."""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range is None:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def stream(request, full_path):
+    stat = os.stat(full_path)
+    last_modified = int(stat.st_mtime)
+    etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        response['ETag'] = etag
+        return response
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or 'application/octet-stream'
+    try:
+        byte_range = parse_range(
+            request.META.get('HTTP_RANGE', ''), stat.st_size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+        return response
+    if byte_range and range_matches(request, etag, last_modified):
+        start, stop = byte_range
+        response = StreamingHttpResponse(
+            mapped_range(full_path, start, stop),
+            status=206, content_type=content_type)
+        response['Content-Range'] = (
+            f'bytes {start}-{stop - 1}/{stat.st_size}')
+        response['Content-Length'] = stop - start
+    else:
+        response = FileResponse(
+            open(full_path, 'rb'), content_type=content_type)
+    if encoding:
+        response['Content-Encoding'] = encoding
+    response['Accept-Ranges'] = 'bytes'
+    response['Last-Modified'] = http_date(last_modified)
+    response['ETag'] = etag
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    full_path = media_path(path)
+    if settings.MEDIA_SERVE == 'stream':
+        response = stream(request, full_path)
+    else:
+        response = offload(path, full_path)
+    if response.status_code in (200, 206, 304):
+        cache_headers(response, path)
+    return response
+
+
+def media_urlpatterns():
+    """Адрес раздачи MEDIA_URL или пустой список, если его отдаёт
+    веб-сервер или MEDIA_URL указывает на другой хост."""
+    if not settings.MEDIA_SERVE or urlparse(settings.MEDIA_URL).netloc:
+        return []
+    prefix = re.escape(settings.MEDIA_URL.lstrip('/'))
+    return [re_path(rf'^{prefix}(?P<path>.+)$', serve_media, name='media')]
@@ -0,0 +1,31 @@
+from django.conf import settings
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+def pin_primary(request):
+    """Закрепляет клиента за основной базой после записи в безопасном
+    методе, например в GET-представлении подписки."""
+    request.pins_primary = True
+
+
+class PrimaryPinMiddleware:
+    """После запроса на запись закрепляет клиента за основной базой
+    на REPLICA_PIN_SECONDS — на время отставания реплик."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        writes = (request.method not in SAFE_METHODS
+                  or getattr(request, 'pins_primary', False))
+        if writes and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE,
+                '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
@@ -0,0 +1,44 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import DEFAULT_DB_ALIAS
+
+REPLICATED_APPS = {'posts', 'users', 'auth'}
+
+read_alias = ContextVar('read_alias', default=None)
+
+
+@contextmanager
+def primary_reads():
+    """Чтения внутри блока идут в основную базу.
+
+    Нужно при заполнении кеша: отставшие данные реплики не должны
+    попасть в него на всё время жизни ключа.
+    """
+    token = read_alias.set(None)
+    try:
+        yield
+    finally:
+        read_alias.reset(token)
+
+
+class ReplicaRouter:
+    """Чтения моделей REPLICATED_APPS внутри представлений с
+    core.decorators.replica_reads уходят на реплику, запись и
+    остальные запросы — в основную базу."""
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in REPLICATED_APPS:
+            return read_alias.get()
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Иначе объект, прочитанный с реплики, сохранялся бы на неё.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Схема и данные попадают на реплики репликацией.
+        return db == DEFAULT_DB_ALIAS
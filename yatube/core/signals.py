@@ -0,0 +1,35 @@
+"""Обработчики сигналов моделей, которые можно приглушить.
+
+Пакетные операции удаляют строки обычным QuerySet.delete(), а работу
+обработчиков делают сами один раз на пачку. Внутри muted_signals
+обработчики, подключённые через receiver отсюда, не вызываются; флаг
+живёт в ContextVar и не задевает другие потоки.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+signals_muted = ContextVar('signals_muted', default=False)
+
+
+@contextmanager
+def muted_signals():
+    token = signals_muted.set(True)
+    try:
+        yield
+    finally:
+        signals_muted.reset(token)
+
+
+def receiver(signal, **kwargs):
+    """Как django.dispatch.receiver, но обработчик пропускается внутри
+    muted_signals."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **named):
+            if not signals_muted.get():
+                return func(*args, **named)
+        # Сильная ссылка: иначе обёртку сразу соберёт сборщик мусора.
+        signal.connect(wrapper, weak=False, **kwargs)
+        return func
+    return decorator
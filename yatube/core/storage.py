@@ -0,0 +1,49 @@
+"""Файловое хранилище, именующее файлы по содержимому.
+
+Файл сохраняется как <каталог>/<2 символа>/<sha256><расширение>, где
+каталог берётся из upload_to. Одинаковые загрузки получают одно имя и
+лежат на диске один раз, а миниатюры sorl, ключ которых строится из
+имени исходника, тоже становятся общими. Хранилище ничего не знает о
+ссылках на файл: удалять его можно, только когда на него никто не
+ссылается, это решает вызывающий код.
+"""
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+CHUNK_SIZE = 64 * 2 ** 10
+
+
+def content_hash(content):
+    """sha256 содержимого файла, читаемого по частям."""
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks(CHUNK_SIZE):
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    def content_name(self, name, content):
+        directory, filename = os.path.split(name)
+        digest = content_hash(content)
+        extension = os.path.splitext(filename)[1].lower()
+        return os.path.join(directory, digest[:2], digest + extension)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.content_name(name, content)
+        if self.exists(name):
+            return name
+        # Одновременная загрузка того же содержимого может успеть
+        # первой: тогда FileSystemStorage выберет соседнее имя, и файл
+        # просто не будет разделён.
+        return super().save(name, content, max_length)
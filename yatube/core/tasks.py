@@ -0,0 +1,41 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.BACKGROUND_WORKERS,
+            thread_name_prefix='yatube-task',
+        )
+    return _executor
+
+
+def _run(func, args, kwargs):
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception('Фоновая задача %s завершилась с ошибкой', func)
+    finally:
+        connections.close_all()
+
+
+def defer(func, *args, **kwargs):
+    """Выполняет func вне обработки запроса, после фиксации транзакции.
+
+    При TASKS_ALWAYS_EAGER задача выполняется сразу в текущем потоке —
+    так работают тесты и локальная разработка.
+    """
+    if settings.TASKS_ALWAYS_EAGER:
+        return func(*args, **kwargs)
+    transaction.on_commit(
+        lambda: get_executor().submit(_run, func, args, kwargs)
+    )
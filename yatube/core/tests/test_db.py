@@ -0,0 +1,34 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+
+
+class SQLitePragmaTests(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_profile_applied_to_connection(self):
+        """Профиль SQLITE_PRAGMAS применяется к соединению."""
+        if connection.vendor != 'sqlite':
+            self.skipTest('Профиль применяется только к SQLite')
+        expected = {
+            'busy_timeout': 5000,
+            'synchronous': 1,  # NORMAL
+            'temp_store': 2,  # MEMORY
+            'cache_size': -64 * 1024,
+        }
+        for name, value in expected.items():
+            with self.subTest(pragma=name):
+                self.assertEqual(self.pragma(name), value)
+
+
+class OptimizeCommandTests(TransactionTestCase):
+    def test_optimize_command(self):
+        """Команда optimize_db обновляет статистику планировщика."""
+        out = StringIO()
+        call_command('optimize_db', stdout=out)
+        self.assertTrue(out.getvalue())
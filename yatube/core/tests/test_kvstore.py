@@ -0,0 +1,64 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from sorl.thumbnail.images import ImageFile
+
+from ..kvstore import MISSING, KVStore, LRUCache
+
+
+class LRUCacheTests(SimpleTestCase):
+    def test_evicts_least_recently_used(self):
+        """При переполнении вытесняется давно не читанная запись."""
+        lru = LRUCache(2, 60)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+        self.assertEqual(lru.get('a'), 1)
+        self.assertIs(lru.get('b'), MISSING)
+        self.assertEqual(len(lru), 2)
+
+    def test_entries_expire(self):
+        """Запись старше timeout не отдаётся."""
+        lru = LRUCache(10, 60)
+        with mock.patch('core.kvstore.time.monotonic', return_value=100):
+            lru.set('a', 1)
+        with mock.patch('core.kvstore.time.monotonic', return_value=161):
+            self.assertIs(lru.get('a'), MISSING)
+        self.assertEqual(len(lru), 0)
+
+
+class KVStoreTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        KVStore.local.clear()
+        KVStore.stats.clear()
+        self.store = KVStore()
+        self.image = ImageFile('posts/store.jpg')
+        self.image.set_size((960, 339))
+
+    def test_reads_go_to_lru(self):
+        """После первого чтения запись берётся из LRU без кеша и базы."""
+        self.store.set(self.image)
+        cache.clear()
+        with self.assertNumQueries(1):
+            self.store.get(self.image)
+        with self.assertNumQueries(0):
+            thumbnail = self.store.get(self.image)
+        self.assertEqual(list(thumbnail.size), [960, 339])
+        self.assertEqual(KVStore.stats, {'db': 1, 'local': 1})
+
+    def test_missing_key_not_kept_locally(self):
+        """Отсутствие ключа не запоминается в LRU."""
+        self.assertIsNone(self.store.get(self.image))
+        self.assertEqual(len(KVStore.local), 0)
+        self.store.set(self.image)
+        self.assertIsNotNone(self.store.get(self.image))
+
+    def test_delete_drops_local_entry(self):
+        """Удаление убирает запись и из LRU."""
+        self.store.set(self.image)
+        self.store.get(self.image)
+        self.store.delete(self.image)
+        self.assertIsNone(self.store.get(self.image))
@@ -0,0 +1,99 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+CONTENT = b'0123456789'
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, MEDIA_SERVE='stream')
+class ServeMediaTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        for name in ('posts/file.txt', 'cache/ab/thumb.txt'):
+            path = os.path.join(TEMP_MEDIA_ROOT, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as file:
+                file.write(CONTENT)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def get(self, path, **headers):
+        return self.client.get(settings.MEDIA_URL + path, **headers)
+
+    def test_full_file(self):
+        """Файл отдаётся целиком с валидаторами и кешированием."""
+        response = self.get('posts/file.txt')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['Content-Length'], str(len(CONTENT)))
+        self.assertIn('max-age=3600', response['Cache-Control'])
+        self.assertNotIn('immutable', response['Cache-Control'])
+        thumbnail = self.get('cache/ab/thumb.txt')
+        self.assertIn('immutable', thumbnail['Cache-Control'])
+        self.assertIn('max-age=31536000', thumbnail['Cache-Control'])
+
+    def test_ranges(self):
+        """Range отдаёт фрагмент, невыполнимый диапазон — 416."""
+        cases = {
+            'bytes=2-5': (206, b'2345', 'bytes 2-5/10'),
+            'bytes=7-': (206, b'789', 'bytes 7-9/10'),
+            'bytes=-3': (206, b'789', 'bytes 7-9/10'),
+            'bytes=8-100': (206, b'89', 'bytes 8-9/10'),
+            'bytes=10-': (416, b'', 'bytes */10'),
+        }
+        for header, (status, body, content_range) in cases.items():
+            with self.subTest(range=header):
+                response = self.get('posts/file.txt', HTTP_RANGE=header)
+                self.assertEqual(response.status_code, status)
+                self.assertEqual(response['Content-Range'], content_range)
+                if status == 206:
+                    self.assertEqual(
+                        b''.join(response.streaming_content), body)
+                    self.assertEqual(
+                        response['Content-Length'], str(len(body)))
+
+    def test_conditional_requests(self):
+        """If-None-Match даёт 304, устаревший If-Range — весь файл."""
+        etag = self.get('posts/file.txt')['ETag']
+        response = self.get('posts/file.txt', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        response = self.get(
+            'posts/file.txt', HTTP_RANGE='bytes=0-1', HTTP_IF_RANGE='"old"')
+        self.assertEqual(response.status_code, 200)
+        response = self.get(
+            'posts/file.txt', HTTP_RANGE='bytes=0-1', HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, 206)
+
+    def test_bad_paths(self):
+        """Пути вне MEDIA_ROOT и несуществующие файлы — 404,
+        запись — 405."""
+        for path in ('posts/missing.txt', '../settings.py', 'posts/'):
+            with self.subTest(path=path):
+                self.assertEqual(self.get(path).status_code, 404)
+        response = self.client.post(settings.MEDIA_URL + 'posts/file.txt')
+        self.assertEqual(response.status_code, 405)
+
+    def test_offload_headers(self):
+        """В режимах отдачи веб-сервером тело пустое, путь в заголовке."""
+        with self.settings(MEDIA_SERVE='x-accel-redirect'):
+            response = self.get('cache/ab/thumb.txt')
+        self.assertEqual(
+            response['X-Accel-Redirect'],
+            '/protected-media/cache/ab/thumb.txt')
+        self.assertEqual(response.content, b'')
+        self.assertIn('immutable', response['Cache-Control'])
+        with self.settings(MEDIA_SERVE='x-sendfile'):
+            response = self.get('posts/file.txt')
+        self.assertEqual(
+            response['X-Sendfile'],
+            os.path.join(TEMP_MEDIA_ROOT, 'posts', 'file.txt'))
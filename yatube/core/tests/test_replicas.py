@@ -0,0 +1,115 @@
+import os
+import sqlite3
+import tempfile
+from contextlib import closing
+
+from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.db import router
+from django.http import HttpResponse
+from django.test import (RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+from django.urls import reverse
+
+from posts.models import Post
+
+from ..decorators import anonymous_page_cache, replica_reads
+from ..management.commands.sync_replica import copy_database
+from ..routers import primary_reads
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Author')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def read_alias(self, request):
+        @replica_reads
+        def view(request):
+            return router.db_for_read(Post)
+        return view(request)
+
+    def test_view_reads_from_replica(self):
+        """Чтения представлений с replica_reads идут на реплику."""
+        request = RequestFactory().get('/')
+        self.assertEqual(self.read_alias(request), 'replica')
+        self.assertEqual(router.db_for_read(Post), 'default')
+
+    def test_pinned_client_reads_primary(self):
+        """Клиент с cookie закрепления читает из основной базы."""
+        request = RequestFactory().get('/')
+        request.COOKIES['pin_primary'] = '1'
+        self.assertEqual(self.read_alias(request), 'default')
+
+    def test_cache_fill_reads_primary(self):
+        """Заполнение кеша внутри представления читает основную базу."""
+        @replica_reads
+        def view(request):
+            with primary_reads():
+                return router.db_for_read(Post)
+        self.assertEqual(view(RequestFactory().get('/')), 'default')
+
+    def test_page_cache_fill_reads_primary(self):
+        """Гостевая страница, которая ляжет в кеш, читает основную базу;
+        страница для сессии — реплику."""
+        @replica_reads
+        @anonymous_page_cache
+        def view(request):
+            return HttpResponse(router.db_for_read(Post))
+        request = RequestFactory().get('/replica-page/')
+        self.assertEqual(view(request).content, b'default')
+        request.COOKIES[settings.SESSION_COOKIE_NAME] = 'session'
+        self.assertEqual(view(request).content, b'replica')
+
+    def test_cached_index_reads_primary(self):
+        """Главная с кешем фрагмента ленты не читает реплику."""
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, self.post.text)
+
+    def test_write_pins_client(self):
+        """После записи клиент получает cookie закрепления."""
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'Комментарий'},
+        )
+        cookie = response.cookies['pin_primary']
+        self.assertEqual(cookie['max-age'], 10)
+
+    def test_follow_get_pins_client(self):
+        """GET-подписка и отписка тоже закрепляют клиента."""
+        reader = User.objects.create_user(username='Reader')
+        self.client.force_login(reader)
+        for name in ('posts:profile_follow', 'posts:profile_unfollow'):
+            with self.subTest(view=name):
+                response = self.client.get(
+                    reverse(name, args=[self.user.username]))
+                self.assertIn('pin_primary', response.cookies)
+
+    def test_replica_object_saved_to_primary(self):
+        """Объект, прочитанный с реплики, сохраняется в основную базу."""
+        post = Post(pk=self.post.pk)
+        post._state.db = 'replica'
+        self.assertEqual(router.db_for_write(Post, instance=post), 'default')
+
+
+class SyncReplicaTests(SimpleTestCase):
+    def test_copy_database(self):
+        """Копия базы содержит данные основной."""
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, 'primary.sqlite3')
+            target = os.path.join(directory, 'replica.sqlite3')
+            with closing(sqlite3.connect(source)) as connection:
+                connection.execute('CREATE TABLE post (text TEXT)')
+                connection.execute("INSERT INTO post VALUES ('пост')")
+                connection.commit()
+            copy_database(source, target)
+            with closing(sqlite3.connect(target)) as connection:
+                rows = connection.execute('SELECT text FROM post').fetchall()
+        self.assertEqual(rows, [('пост',)])
@@ -0,0 +1,21 @@
+from django.dispatch import Signal
+from django.test import SimpleTestCase
+
+from ..signals import muted_signals, receiver
+
+
+class MutedSignalsTests(SimpleTestCase):
+    def test_receiver_skipped_when_muted(self):
+        """Обработчик вызывается, кроме как внутри muted_signals."""
+        signal = Signal()
+        calls = []
+
+        @receiver(signal)
+        def handler(sender, **kwargs):
+            calls.append(sender)
+
+        signal.send('first')
+        with muted_signals():
+            signal.send('muted')
+        signal.send('second')
+        self.assertEqual(calls, ['first', 'second'])
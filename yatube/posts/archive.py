@@ -0,0 +1,85 @@
+"""Перенос старых постов и комментариев в архивные таблицы.
+
+Архивный пост сохраняет id исходного, поэтому адреса постов не меняются:
+страница поста и ленты читают обе таблицы через with_archive и get_post.
+"""
+from django.core.cache import cache
+from django.db import transaction
+
+from core.signals import muted_signals
+
+from .feeds import feed_queryset, recent_posts_key
+from .models import (ArchivedComment, ArchivedPost, Comment, Post,
+                     TimelineEntry)
+from .utils import ChainedFeed, bump_feed_version, feed_count_key
+
+POST_FIELDS = (
+    'id', 'text', 'pub_date', 'updated', 'author_id', 'group_id', 'image',
+    'comments_count',
+)
+COMMENT_FIELDS = ('id', 'post_id', 'author_id', 'text', 'created')
+
+
+def with_archive(posts, archived):
+    """Лента постов, продолжающаяся архивными постами того же фильтра."""
+    return ChainedFeed(feed_queryset(posts), feed_queryset(archived))
+
+
+def get_post(post_id, related=()):
+    """Пост по id из горячей таблицы или из архива; None, если его нет."""
+    for model in (Post, ArchivedPost):
+        post = model.objects.select_related(*related).filter(
+            pk=post_id).first()
+        if post is not None:
+            return post
+    return None
+
+
+def archive_batch(post_ids):
+    ArchivedPost.objects.bulk_create(
+        ArchivedPost(**values) for values in Post.objects.filter(
+            pk__in=post_ids).values(*POST_FIELDS)
+    )
+    comments = Comment.objects.filter(post_id__in=post_ids)
+    ArchivedComment.objects.bulk_create(
+        ArchivedComment(**values)
+        for values in comments.values(*COMMENT_FIELDS)
+    )
+    entries = TimelineEntry.objects.filter(post_id__in=post_ids)
+    followers = set(entries.values_list('user_id', flat=True))
+    # Без сигналов: счётчики постов, комментариев и ссылок на картинки
+    # остаются верными, ведь записи не исчезли, а перешли в архив.
+    with muted_signals():
+        for queryset in (
+            comments,
+            entries,
+            Post.objects.filter(pk__in=post_ids),
+        ):
+            queryset.delete()
+    return followers
+
+
+def archive_old_posts(cutoff, batch_size):
+    """Переносит в архив посты, опубликованные раньше cutoff.
+
+    Каждая пачка переносится в своей транзакции; возвращает число
+    перенесённых постов.
+    """
+    archived = 0
+    old_posts = Post.objects.filter(pub_date__lt=cutoff).order_by('pk')
+    while True:
+        batch = list(old_posts.values_list('pk', 'author_id')[:batch_size])
+        if not batch:
+            return archived
+        post_ids, author_ids = zip(*batch)
+        with transaction.atomic():
+            followers = archive_batch(post_ids)
+        # Кешированные списки последних постов авторов ссылаются
+        # на горячую таблицу и строятся заново, как и число постов
+        # в лентах подписчиков, потерявших строки ленты.
+        cache.delete_many(
+            [recent_posts_key(author_id) for author_id in set(author_ids)]
+            + [feed_count_key('follower', user_id) for user_id in followers])
+        for user_id in followers:
+            bump_feed_version(f'follow:{user_id}')
+        archived += len(post_ids)
@@ -0,0 +1,126 @@
+import hashlib
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+from django.urls import NoReverseMatch, reverse
+
+from core.decorators import purge_paths
+from core.routers import primary_reads
+
+from .models import ArchivedPost, Post
+from .utils import bump_feed_version, feed_version
+
+
+def versions_etag(request, *feeds):
+    """ETag из версий лент в кеше: без запросов к базе.
+
+    Для вошедшего пользователя добавляются версия его подписок
+    и версия рекомендаций.
+    """
+    user_id = request.user.pk
+    if user_id is not None:
+        feeds += (f'follow:{user_id}', 'suggestions')
+    return '-'.join(
+        [str(feed_version(feed)) for feed in feeds] + [str(user_id)])
+
+
+def index_etag(request):
+    return versions_etag(request, 'index')
+
+
+def group_etag(request, slug):
+    """Версия сообщества меняется при записи его постов и самой группы."""
+    return versions_etag(request, group_feed(slug))
+
+
+def profile_etag(request, username):
+    """Версия автора меняется при записи его постов и подписок на него
+    или его самого."""
+    return versions_etag(request, author_feed(username))
+
+
+# Ключи кеша должны быть ASCII без пробелов, а слаги и имена — нет.
+def group_feed(slug):
+    return f'group:{quote(slug)}'
+
+
+def author_feed(username):
+    return f'author:{quote(username)}'
+
+
+def group_slug_paths(slugs):
+    paths = []
+    for slug in slugs:
+        try:
+            paths.append(reverse('posts:posts_group', args=[slug]))
+        except NoReverseMatch:
+            pass
+    return paths
+
+
+def purge_profiles(usernames):
+    """Сбрасывает ETag и гостевой кеш профилей usernames."""
+    paths = []
+    for username in usernames:
+        bump_feed_version(author_feed(username))
+        paths.append(reverse('posts:profile', args=[username]))
+    purge_paths(paths)
+
+
+def post_modified_key(post_id):
+    return f'post_modified:{post_id}'
+
+
+def post_validators(post_id):
+    """Время последнего изменения поста или комментария к нему и имя
+    автора; None, если поста нет.
+
+    Значение хранится в кеше до записи поста или комментария.
+    """
+    key = post_modified_key(post_id)
+    validators = cache.get(key)
+    if validators is None:
+        with primary_reads():
+            for model in (Post, ArchivedPost):
+                row = model.objects.filter(pk=post_id).annotate(
+                    last_comment=Max('comments__created'),
+                ).values_list(
+                    'updated', 'last_comment', 'author__username').first()
+                if row is not None:
+                    break
+        if row is None:
+            return None
+        updated, last_comment, username = row
+        validators = (max(updated, last_comment or updated), username)
+        cache.set(key, validators, settings.CONDITIONAL_CACHE_TIMEOUT)
+    return validators
+
+
+def post_last_modified(request, post_id):
+    # Страница вошедшего пользователя зависит ещё от CSRF-токена формы,
+    # который время изменения не отражает: её проверяет только ETag.
+    if request.user.is_authenticated:
+        return None
+    validators = post_validators(post_id)
+    return validators and validators[0]
+
+
+def post_etag(request, post_id):
+    """ETag страницы поста: время изменения, версия автора (его счётчик
+    постов на странице) и для вошедшего — хеш CSRF-cookie."""
+    validators = post_validators(post_id)
+    if validators is None:
+        return None
+    last_modified, username = validators
+    parts = [
+        post_id, last_modified.timestamp(),
+        feed_version(author_feed(username)), request.user.pk,
+    ]
+    token = request.COOKIES.get(settings.CSRF_COOKIE_NAME)
+    if request.user.is_authenticated and token:
+        # После входа токен меняется, и закешированная браузером форма
+        # со старым токеном не должна вернуться по 304.
+        parts.append(hashlib.sha256(token.encode()).hexdigest()[:16])
+    return '-'.join(map(str, parts))
@@ -0,0 +1,198 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils.text import Truncator
+
+from core.tasks import defer
+
+from . import thumbnails
+from .models import (ArchivedComment, ArchivedPost, Comment, Follow, Group,
+                     GroupStats, Post, StoredImage, User, UserStats)
+
+USER_COUNTERS = {
+    'posts_count': (Post, 'author'),
+    'followers_count': (Follow, 'author'),
+    'following_count': (Follow, 'user'),
+}
+# Архивные посты по-прежнему входят в число постов автора.
+ARCHIVED_COUNTERS = {
+    'posts_count': (ArchivedPost, 'author'),
+}
+
+
+def shift_counter(queryset, field, delta):
+    """Атомарно сдвигает счётчик выражением F(), не уходя ниже нуля."""
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def shift_user_stats(user_id, field, delta):
+    if user_id is not None:
+        shift_counter(UserStats.objects.filter(pk=user_id), field, delta)
+
+
+def shift_comments_count(post_id, delta):
+    if post_id is not None:
+        shift_counter(Post.objects.filter(pk=post_id), 'comments_count', delta)
+
+
+def shift_group_stats(group_id, delta):
+    if group_id is not None:
+        shift_counter(
+            GroupStats.objects.filter(pk=group_id), 'posts_count', delta)
+
+
+def shift_image_refs(name, delta):
+    """Сдвигает число ссылок на файл картинки; файл без ссылок
+    удаляется вместе с миниатюрами после коммита."""
+    if not name:
+        return
+    images = StoredImage.objects.filter(name=name)
+    if delta > 0:
+        StoredImage.objects.bulk_create(
+            [StoredImage(name=name)], ignore_conflicts=True)
+    shift_counter(images, 'refs', delta)
+    if delta < 0 and images.filter(refs=0).delete()[0]:
+        defer(thumbnails.delete_image, name)
+
+
+def last_post_fields(post):
+    """Поля превью последнего поста для GroupStats; post может быть None."""
+    if post is None:
+        return {'last_post_id': None, 'last_pub_date': None,
+                'last_post_text': ''}
+    return {
+        'last_post_id': post.pk,
+        'last_pub_date': post.pub_date,
+        'last_post_text': Truncator(post.text).chars(
+            GroupStats._meta.get_field('last_post_text').max_length),
+    }
+
+
+def push_group_post(post):
+    """Делает пост последним в сообществе, если он не старше текущего."""
+    if post.group_id is None:
+        return
+    GroupStats.objects.filter(
+        Q(last_pub_date=None) | Q(last_pub_date__lte=post.pub_date),
+        pk=post.group_id,
+    ).update(**last_post_fields(post))
+
+
+def latest_group_post(group_id):
+    # Архивные посты старше горячих: архив читается, только если
+    # в горячей таблице постов сообщества не осталось.
+    for model in (Post, ArchivedPost):
+        post = model.objects.filter(group_id=group_id).order_by(
+            '-pub_date', '-pk').only('pub_date', 'text').first()
+        if post is not None:
+            return post
+    return None
+
+
+def refresh_group_last_post(group_id):
+    if group_id is not None:
+        GroupStats.objects.filter(pk=group_id).update(
+            **last_post_fields(latest_group_post(group_id)))
+
+
+def drop_group_post(post_id, group_id):
+    """Пересобирает превью, если удалённый из сообщества пост был
+    последним; иначе превью не меняется и запросов к постам нет."""
+    if GroupStats.objects.filter(
+            pk=group_id, last_post_id=post_id).exists():
+        refresh_group_last_post(group_id)
+
+
+def count_of(model, lookup):
+    """Подзапрос: число строк model, ссылающихся на внешнюю строку."""
+    rows = model.objects.filter(**{lookup: OuterRef('pk')}).order_by().values(
+        lookup).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def user_count(field):
+    actual = count_of(*USER_COUNTERS[field])
+    if field in ARCHIVED_COUNTERS:
+        actual = actual + count_of(*ARCHIVED_COUNTERS[field])
+    return actual
+
+
+def repair(model, field, actual):
+    stale = model.objects.annotate(actual=actual).exclude(
+        **{field: F('actual')}).values('pk')
+    return model.objects.filter(pk__in=stale).update(**{field: actual})
+
+
+def recount():
+    """Пересчитывает все счётчики по данным.
+
+    Возвращает число исправленных значений.
+    """
+    UserStats.objects.bulk_create(
+        (
+            UserStats(user_id=user_id) for user_id
+            in User.objects.filter(stats=None).values_list('pk', flat=True)
+        ),
+        ignore_conflicts=True,
+    )
+    fixed = sum(
+        repair(UserStats, field, user_count(field)) for field in USER_COUNTERS
+    )
+    fixed += repair(
+        ArchivedPost, 'comments_count', count_of(ArchivedComment, 'post'))
+    fixed += recount_groups()
+    fixed += recount_images()
+    return fixed + repair(Post, 'comments_count', count_of(Comment, 'post'))
+
+
+def latest_post_id():
+    """Подзапрос: id последнего поста сообщества с учётом архива."""
+    return Coalesce(*(
+        Subquery(
+            model.objects.filter(group=OuterRef('pk')).order_by(
+                '-pub_date', '-pk').values('pk')[:1],
+            output_field=IntegerField(),
+        )
+        for model in (Post, ArchivedPost)
+    ))
+
+
+def recount_groups():
+    GroupStats.objects.bulk_create(
+        (
+            GroupStats(group_id=group_id) for group_id
+            in Group.objects.filter(stats=None).values_list('pk', flat=True)
+        ),
+        ignore_conflicts=True,
+    )
+    fixed = repair(
+        GroupStats, 'posts_count',
+        count_of(Post, 'group') + count_of(ArchivedPost, 'group'))
+    stale = GroupStats.objects.annotate(actual=latest_post_id()).exclude(
+        Q(last_post_id=F('actual')) | Q(last_post_id=None, actual=None),
+    ).values_list('pk', flat=True)
+    for group_id in stale:
+        refresh_group_last_post(group_id)
+        fixed += 1
+    return fixed
+
+
+def recount_images():
+    """Сверяет StoredImage со ссылками из постов и архива; файлы, на
+    которые больше никто не ссылается, удаляются."""
+    referenced = set()
+    for model in (Post, ArchivedPost):
+        referenced.update(model.objects.exclude(image='').values_list(
+            'image', flat=True).order_by().distinct().iterator())
+    known = set(StoredImage.objects.values_list('name', flat=True))
+    StoredImage.objects.bulk_create(
+        StoredImage(name=name) for name in referenced - known)
+    fixed = repair(
+        StoredImage, 'refs',
+        count_of(Post, 'image') + count_of(ArchivedPost, 'image'))
+    for name in StoredImage.objects.filter(refs=0).values_list(
+            'name', flat=True):
+        StoredImage.objects.filter(name=name, refs=0).delete()
+        defer(thumbnails.delete_image, name)
+    return fixed
@@ -0,0 +1,283 @@
+"""Потоковый перенос постов, комментариев и подписок в NDJSON.
+
+Каждая строка — запись в формате фикстур Django: model, pk, fields.
+Пользователи и сообщества ссылаются друг на друга по username и slug,
+поэтому дамп можно загрузить в базу с другими id.
+"""
+import datetime
+import json
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import reset_queries, transaction
+from django.db.models import Max
+from django.utils.dateparse import parse_datetime
+
+from .models import (ArchivedComment, ArchivedPost, Comment, Follow, Group,
+                     Post, UserStats)
+
+User = get_user_model()
+
+USER_FIELDS = (
+    'username', 'password', 'email', 'first_name', 'last_name',
+    'is_active', 'date_joined',
+)
+CHUNK_SIZE = 2000
+
+
+class DumpEncoder(DjangoJSONEncoder):
+    """Даты с микросекундами: DjangoJSONEncoder отбрасывает их часть."""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def export_records():
+    """Записи дампа по одной; порядок моделей позволяет загрузке
+    разрешать ссылки на уже загруженные строки."""
+    for user in User.objects.order_by('pk').values(
+            'pk', *USER_FIELDS).iterator(CHUNK_SIZE):
+        yield 'auth.user', user.pop('pk'), user
+    for group in Group.objects.order_by('pk').values(
+            'pk', 'slug', 'title', 'description').iterator(CHUNK_SIZE):
+        yield 'posts.group', group.pop('pk'), group
+    # Архивные посты выгружаются как обычные: их id не пересекаются
+    # с горячими, а после загрузки архив заполнит archive_posts.
+    for model in (Post, ArchivedPost):
+        posts = model.objects.order_by('pk').values_list(
+            'pk', 'author__username', 'group__slug', 'text', 'pub_date',
+            'updated', 'image',
+        )
+        for pk, author, group, text, pub_date, updated, image in (
+                posts.iterator(CHUNK_SIZE)):
+            yield 'posts.post', pk, {
+                'author': author, 'group': group, 'text': text,
+                'pub_date': pub_date, 'updated': updated, 'image': image,
+            }
+    for model in (Comment, ArchivedComment):
+        comments = model.objects.exclude(post=None).order_by(
+            'pk').values_list(
+            'pk', 'post_id', 'author__username', 'text', 'created')
+        for pk, post, author, text, created in comments.iterator(
+                CHUNK_SIZE):
+            yield 'posts.comment', pk, {
+                'post': post, 'author': author, 'text': text,
+                'created': created,
+            }
+    follows = Follow.objects.exclude(user=None).exclude(author=None).order_by(
+        'pk').values_list('pk', 'user__username', 'author__username')
+    for pk, user, author in follows.iterator(CHUNK_SIZE):
+        yield 'posts.follow', pk, {'user': user, 'author': author}
+
+
+def export_ndjson(stream):
+    """Пишет дамп в текстовый поток; возвращает число записей."""
+    count = 0
+    for model, pk, fields in export_records():
+        stream.write(json.dumps(
+            {'model': model, 'pk': pk, 'fields': fields},
+            cls=DumpEncoder,
+            ensure_ascii=False,
+        ))
+        stream.write('\n')
+        count += 1
+    return count
+
+
+@contextmanager
+def keep_dates(*models):
+    """Отключает auto_now и auto_now_add, чтобы сохранить даты из дампа."""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False)
+        or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now = auto_now
+            field.auto_now_add = auto_now_add
+
+
+class Importer:
+    """Загружает NDJSON-дамп пачками bulk_create.
+
+    Посты и комментарии получают id из дампа со сдвигом на максимальный
+    id базы на момент первого запуска, поэтому ссылки комментариев
+    на посты не требуют таблицы соответствия, а повторная загрузка
+    пачки после сбоя пропускается через ignore_conflicts.
+    """
+
+    def __init__(self, batch_size, checkpoint=None):
+        self.batch_size = batch_size
+        self.checkpoint = checkpoint or {}
+        self.checkpoint.setdefault('offset', 0)
+        self.checkpoint.setdefault(
+            'post_shift', self.max_pk(Post, ArchivedPost))
+        self.checkpoint.setdefault(
+            'comment_shift', self.max_pk(Comment, ArchivedComment))
+        self.user_ids = {}
+        self.group_ids = {}
+        self.skipped = 0
+        self.loaded = 0
+
+    @staticmethod
+    def max_pk(*models):
+        # Архивные строки сохраняют id, их тоже нельзя занимать.
+        return max(
+            model.objects.aggregate(pk=Max('pk'))['pk'] or 0
+            for model in models
+        )
+
+    def resolve(self, model, field, keys, known):
+        """id строк model по значениям уникального поля field."""
+        missing = {key for key in keys if key is not None} - known.keys()
+        if missing:
+            known.update(model.objects.filter(
+                **{f'{field}__in': missing}).values_list(field, 'pk'))
+        return known
+
+    def build_users(self, rows):
+        return [
+            User(**dict(fields, date_joined=parse_datetime(
+                fields['date_joined'])))
+            for _, fields in rows
+        ]
+
+    def load_users(self, rows):
+        User.objects.bulk_create(
+            self.build_users(rows), ignore_conflicts=True)
+        user_ids = self.resolve(
+            User, 'username', [fields['username'] for _, fields in rows],
+            self.user_ids)
+        UserStats.objects.bulk_create(
+            [UserStats(user_id=user_ids[fields['username']])
+             for _, fields in rows],
+            ignore_conflicts=True,
+        )
+        return len(rows)
+
+    def load_groups(self, rows):
+        Group.objects.bulk_create(
+            [Group(**fields) for _, fields in rows], ignore_conflicts=True)
+        return len(rows)
+
+    def load_posts(self, rows):
+        user_ids = self.resolve(
+            User, 'username', [fields['author'] for _, fields in rows],
+            self.user_ids)
+        group_ids = self.resolve(
+            Group, 'slug', [fields['group'] for _, fields in rows],
+            self.group_ids)
+        posts = [
+            Post(
+                pk=pk + self.checkpoint['post_shift'],
+                author_id=user_ids[fields['author']],
+                group_id=group_ids.get(fields['group']),
+                text=fields['text'],
+                pub_date=parse_datetime(fields['pub_date']),
+                updated=parse_datetime(fields['updated']),
+                image=fields['image'],
+            )
+            for pk, fields in rows if fields['author'] in user_ids
+        ]
+        Post.objects.bulk_create(posts, ignore_conflicts=True)
+        return len(posts)
+
+    def load_comments(self, rows):
+        user_ids = self.resolve(
+            User, 'username', [fields['author'] for _, fields in rows],
+            self.user_ids)
+        shift = self.checkpoint['post_shift']
+        # Посты без автора в базе не загружались — их комментарии тоже.
+        post_ids = set(Post.objects.filter(
+            pk__in=[fields['post'] + shift for _, fields in rows],
+        ).values_list('pk', flat=True))
+        comments = [
+            Comment(
+                pk=pk + self.checkpoint['comment_shift'],
+                post_id=fields['post'] + shift,
+                author_id=user_ids.get(fields['author']),
+                text=fields['text'],
+                created=parse_datetime(fields['created']),
+            )
+            for pk, fields in rows if fields['post'] + shift in post_ids
+        ]
+        Comment.objects.bulk_create(comments, ignore_conflicts=True)
+        return len(comments)
+
+    def load_follows(self, rows):
+        user_ids = self.resolve(
+            User, 'username',
+            [name for _, fields in rows for name in fields.values()],
+            self.user_ids)
+        follows = [
+            Follow(
+                user_id=user_ids[fields['user']],
+                author_id=user_ids[fields['author']],
+            )
+            for _, fields in rows
+            if fields['user'] in user_ids and fields['author'] in user_ids
+        ]
+        Follow.objects.bulk_create(follows, ignore_conflicts=True)
+        return len(follows)
+
+    LOADERS = {
+        'auth.user': load_users,
+        'posts.group': load_groups,
+        'posts.post': load_posts,
+        'posts.comment': load_comments,
+        'posts.follow': load_follows,
+    }
+
+    def flush(self, model, rows, offset):
+        """Загружает пачку в транзакции и сдвигает контрольную точку.
+
+        Если процесс упадёт между фиксацией и записью точки, пачка
+        загрузится повторно и будет пропущена через ignore_conflicts.
+        """
+        if not rows:
+            return
+        with transaction.atomic():
+            loaded = self.LOADERS[model](self, rows)
+        # При DEBUG журнал запросов держал бы SQL всех пачек.
+        reset_queries()
+        self.loaded += loaded
+        self.skipped += len(rows) - loaded
+        self.checkpoint['offset'] = offset
+
+    def run(self, stream, on_batch=None):
+        """Читает бинарный поток построчно с сохранённого смещения.
+
+        on_batch(importer) вызывается после каждой пачки — для отчёта
+        о скорости и записи контрольной точки.
+        """
+        stream.seek(self.checkpoint['offset'])
+        offset = self.checkpoint['offset']
+        model, rows = None, []
+        with keep_dates(Post, Comment):
+            for line in stream:
+                record = json.loads(line) if line.strip() else None
+                if record is not None and (
+                        record['model'] != model
+                        or len(rows) >= self.batch_size):
+                    self.flush(model, rows, offset)
+                    if rows and on_batch:
+                        on_batch(self)
+                    model, rows = record['model'], []
+                offset += len(line)
+                if record is not None:
+                    if record['model'] not in self.LOADERS:
+                        self.skipped += 1
+                        continue
+                    rows.append((record['pk'], record['fields']))
+            self.flush(model, rows, offset)
+            if rows and on_batch:
+                on_batch(self)
@@ -0,0 +1,214 @@
+import heapq
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+from core.routers import primary_reads
+
+from .models import ArchivedPost, Follow, Post, TimelineEntry, UserStats
+from .utils import (CachedCountPaginator, ChainedFeed, bump_feed_version,
+                    feed_count_key)
+
+
+FEED_FIELDS = (
+    'text', 'pub_date', 'image', 'comments_count',
+    'author__username', 'group__slug', 'group__title',
+)
+
+
+def feed_queryset(queryset):
+    """Посты для карточек ленты: автор и сообщество одним JOIN,
+    лишние колонки пользователя и сообщества не читаются."""
+    return queryset.select_related('author', 'group').only(*FEED_FIELDS)
+
+
+def bulk_add_entries(entries):
+    TimelineEntry.objects.bulk_create(
+        entries,
+        batch_size=settings.FEED_FANOUT_BATCH,
+        ignore_conflicts=True,
+    )
+
+
+def fan_out_post(post_id):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    post = Post.objects.filter(pk=post_id).values(
+        'author_id', 'pub_date').first()
+    if post is None:
+        return
+    if not UserStats.objects.filter(
+        pk=post['author_id'],
+        followers_count__gt=settings.FEED_FANOUT_MAX_FOLLOWERS,
+    ).exists():
+        followers = Follow.objects.filter(author_id=post['author_id'])
+        bulk_add_entries(
+            TimelineEntry(user_id=user_id, post_id=post_id, **post)
+            for user_id in followers.values_list(
+                'user_id', flat=True).iterator()
+        )
+    # Пост мог попасть в чужой пересчёт до записи строк ленты.
+    reset_follower_counts(post['author_id'])
+
+
+def reset_follower_counts(author_id):
+    """Сбрасывает число постов в лентах подписчиков автора.
+
+    Подписчиков может быть много, поэтому это делает фоновая задача,
+    а не запрос, записавший пост; ключи пересчитаются при чтении.
+    """
+    followers = Follow.objects.filter(author_id=author_id).values_list(
+        'user_id', flat=True).iterator()
+    while True:
+        batch = list(islice(followers, settings.FEED_FANOUT_BATCH))
+        if not batch:
+            return
+        cache.delete_many(
+            [feed_count_key('follower', user_id) for user_id in batch])
+
+
+def backfill_timeline(user_id, author_id):
+    """Добавляет в ленту нового подписчика все посты автора."""
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'pk', 'pub_date')
+    bulk_add_entries(
+        TimelineEntry(
+            user_id=user_id,
+            author_id=author_id,
+            post_id=post_id,
+            pub_date=pub_date,
+        )
+        for post_id, pub_date in posts.iterator()
+    )
+    # Пока задача ждала очереди, лента могла закешировать число без
+    # постов нового автора.
+    cache.delete(feed_count_key('follower', user_id))
+    bump_feed_version(f'follow:{user_id}')
+
+
+def rebuild_timelines():
+    """Дополняет ленты всех подписчиков, например после импорта."""
+    follows = Follow.objects.exclude(user=None).exclude(author=None)
+    for user_id, author_id in follows.values_list(
+            'user_id', 'author_id').iterator():
+        backfill_timeline(user_id, author_id)
+
+
+def prolific_author_ids(user_id):
+    """Авторы из подписок пользователя, чьи посты не раскладываются."""
+    key = f'feed_prolific:{user_id}'
+    authors = cache.get(key)
+    if authors is None:
+        followed = Follow.objects.filter(user_id=user_id).values('author_id')
+        with primary_reads():
+            authors = list(UserStats.objects.filter(
+                pk__in=followed,
+                followers_count__gt=settings.FEED_FANOUT_MAX_FOLLOWERS,
+            ).values_list('pk', flat=True))
+        cache.set(key, authors, settings.FEED_PROLIFIC_TIMEOUT)
+    return authors
+
+
+def follow_feed(user):
+    """Лента подписок: диапазон материализованной ленты пользователя.
+
+    Посты авторов с очень большим числом подписчиков не раскладываются
+    при записи и подмешиваются к ленте при чтении.
+    """
+    prolific = prolific_author_ids(user.pk)
+    if not prolific:
+        return Post.objects.filter(
+            timeline_entries__user=user
+        ).order_by('-timeline_entries__pub_date')
+    entries = TimelineEntry.objects.filter(user=user).values('post_id')
+    return Post.objects.filter(Q(pk__in=entries) | Q(author_id__in=prolific))
+
+
+def recent_posts_key(author_id):
+    return f'recent_posts:{author_id}'
+
+
+def ring_entry(post):
+    return (post.pub_date.timestamp(), post.pk)
+
+
+def recent_posts(author_ids):
+    """Последние (pub_date, post_id) каждого автора, новые первыми.
+
+    Списки живут в кеше; при промахе список автора строится одним
+    запросом по индексу и сохраняется.
+    """
+    keys = {recent_posts_key(author_id): author_id for author_id in author_ids}
+    rings = cache.get_many(keys)
+    missing = {}
+    for key, author_id in keys.items():
+        if key not in rings:
+            posts = Post.objects.filter(author_id=author_id).order_by(
+                '-pub_date', '-pk')[:settings.FEED_RING_SIZE]
+            with primary_reads():
+                missing[key] = [
+                    ring_entry(post) for post in posts.only('pub_date')]
+    cache.set_many(missing, settings.FEED_RING_TIMEOUT)
+    rings.update(missing)
+    return list(rings.values())
+
+
+def push_recent_post(post):
+    key = recent_posts_key(post.author_id)
+    ring = cache.get(key)
+    if ring is None:
+        return
+    entry = ring_entry(post)
+    if entry not in ring:
+        ring.append(entry)
+        ring.sort(reverse=True)
+        del ring[settings.FEED_RING_SIZE:]
+        cache.set(key, ring, settings.FEED_RING_TIMEOUT)
+
+
+def drop_recent_post(post):
+    # Место удалённого поста займёт более старый — список строится заново.
+    cache.delete(recent_posts_key(post.author_id))
+
+
+def merge_recent_posts(author_ids, start, stop):
+    """k-way слияние списков авторов: посты с позиций [start, stop)."""
+    merged = heapq.merge(*recent_posts(author_ids), reverse=True)
+    post_ids = [post_id for _, post_id in islice(merged, start, stop)]
+    posts = feed_queryset(Post.objects.all()).in_bulk(post_ids)
+    return [posts[post_id] for post_id in post_ids if post_id in posts]
+
+
+class FollowFeedPaginator(CachedCountPaginator):
+    """Первые страницы ленты подписок собираются слиянием кешированных
+    списков авторов, дальние читаются из материализованной ленты."""
+
+    def __init__(self, object_list, per_page, count_key, user_id, **kwargs):
+        super().__init__(object_list, per_page, count_key, **kwargs)
+        self.user_id = user_id
+
+    def page(self, number):
+        number = self.validate_number(number)
+        stop = number * self.per_page
+        if stop > settings.FEED_RING_SIZE:
+            return super().page(number)
+        author_ids = Follow.objects.filter(
+            user_id=self.user_id).values_list('author_id', flat=True)
+        start = stop - self.per_page
+        posts = merge_recent_posts(list(author_ids), start, stop)
+        if len(posts) < min(stop, self.count) - start:
+            # Часть постов из списков авторов ушла в архив.
+            return super().page(number)
+        return self._get_page(posts, number, self)
+
+
+def follow_feed_paginator(user):
+    archived = ArchivedPost.objects.filter(author__following__user=user)
+    return FollowFeedPaginator(
+        ChainedFeed(
+            feed_queryset(follow_feed(user)), feed_queryset(archived)),
+        settings.NUMPOSTS,
+        feed_count_key('follower', user.pk),
+        user.pk,
+    )
@@ -0,0 +1,102 @@
+"""Подписки и отписки: последствия для счётчиков, лент и кешей.
+
+followed и unfollowed вызывают и обработчики сигналов Follow для
+одной подписки, и пакетные операции для всей пачки сразу — те
+записывают строки Follow при заглушённых сигналах.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from core.signals import muted_signals
+from core.tasks import defer
+
+from . import feeds
+from .conditional import purge_profiles
+from .counters import shift_counter, shift_user_stats
+from .graph import suggestions_key
+from .models import Follow, FollowSuggestion, TimelineEntry, User, UserStats
+from .utils import bump_feed_version, feed_count_key
+
+
+def follows_changed(user_id, author_ids):
+    """Сбрасывает кеши, зависящие от подписок user_id на author_ids."""
+    cache.delete_many([
+        feed_count_key('follower', user_id),
+        f'feed_prolific:{user_id}',
+        suggestions_key(user_id),
+    ])
+    bump_feed_version(f'follow:{user_id}')
+    purge_profiles(User.objects.filter(
+        pk__in=[user_id, *author_ids]).values_list('username', flat=True))
+
+
+def followed(user_id, author_ids):
+    """Последствия новых подписок user_id на author_ids."""
+    shift_counter(
+        UserStats.objects.filter(pk__in=author_ids), 'followers_count', 1)
+    shift_user_stats(user_id, 'following_count', len(author_ids))
+    FollowSuggestion.objects.filter(
+        user_id=user_id, author_id__in=author_ids).delete()
+    for author_id in author_ids:
+        defer(feeds.backfill_timeline, user_id, author_id)
+    follows_changed(user_id, author_ids)
+
+
+def unfollowed(user_id, author_ids):
+    """Последствия удаления подписок user_id на author_ids."""
+    shift_counter(
+        UserStats.objects.filter(pk__in=author_ids), 'followers_count', -1)
+    shift_user_stats(user_id, 'following_count', -len(author_ids))
+    TimelineEntry.objects.filter(
+        user_id=user_id, author_id__in=author_ids).delete()
+    follows_changed(user_id, author_ids)
+
+
+def follow_authors(user, authors):
+    """Подписывает user на authors ({id: username}) одним INSERT.
+
+    Возвращает id авторов, подписка на которых появилась. Если такая же
+    подписка создаётся параллельно, счётчики могут разойтись на единицу —
+    их исправляет команда recount.
+    """
+    with transaction.atomic():
+        existing = set(Follow.objects.filter(
+            user=user, author_id__in=authors).values_list(
+            'author_id', flat=True))
+        added = [
+            author_id for author_id in authors
+            if author_id not in existing and author_id != user.pk
+        ]
+        if not added:
+            return []
+        # bulk_create не отправляет сигналы — последствия общие для пачки.
+        Follow.objects.bulk_create(
+            [Follow(user=user, author_id=author_id) for author_id in added],
+            ignore_conflicts=True,
+        )
+        followed(user.pk, added)
+    return added
+
+
+def unfollow_authors(user, authors):
+    """Отписывает user от authors ({id: username}) одной транзакцией.
+
+    Возвращает id авторов, подписка на которых была.
+    """
+    with transaction.atomic():
+        follows = Follow.objects.filter(user=user, author_id__in=authors)
+        removed = list(follows.values_list('author_id', flat=True))
+        if not removed:
+            return []
+        with muted_signals():
+            follows.delete()
+        unfollowed(user.pk, removed)
+    return removed
+
+
+def follow_states(user, usernames):
+    """{username: подписан ли user} для существующих авторов, один запрос."""
+    follows = Follow.objects.filter(user=user, author=OuterRef('pk'))
+    return dict(User.objects.filter(username__in=usernames).annotate(
+        is_followed=Exists(follows)).values_list('username', 'is_followed'))
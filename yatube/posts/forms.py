@@ -1,6 +1,11 @@
+import re
+
 from django import forms
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
 
-from .models import Comment, Post
+from .images import process_image
+from .models import Comment, Group, Post
 
 
 class PostForm(forms.ModelForm):
@@ -13,9 +18,59 @@ class PostForm(forms.ModelForm):
             'image': 'Картинка',
         }
 
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        # Уже сохранённая картинка (FieldFile) при редактировании
+        # приходит без изменений; обрабатываются только новые загрузки.
+        if image and hasattr(image, 'content_type'):
+            return process_image(image)
+        return image
+
+    def save(self, commit=True):
+        post = super().save(commit)
+        image = self.cleaned_data.get('image')
+        if commit and isinstance(image, TemporaryUploadedFile):
+            # Хранилище уже перенесло временный файл; без явного close
+            # его попытается удалить сборщик мусора и упадёт.
+            image.close()
+        return post
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
         model = Comment
         fields = ('text',)
         labels = {'text': 'Текст комментария'}
+
+
+class SearchForm(forms.Form):
+    q = forms.CharField(label='Поиск', max_length=200)
+    group = forms.ModelChoiceField(
+        Group.objects.all(),
+        label='Сообщество',
+        to_field_name='slug',
+        required=False,
+    )
+    author = forms.CharField(label='Автор', max_length=150, required=False)
+
+
+class UsernamesForm(forms.Form):
+    usernames = forms.CharField(
+        label='Авторы',
+        help_text='Имена пользователей через пробел или запятую',
+    )
+
+    def clean_usernames(self):
+        usernames = list(dict.fromkeys(
+            re.split(r'[\s,]+', self.cleaned_data['usernames'].strip())))
+        if len(usernames) > settings.FOLLOW_BULK_MAX:
+            raise forms.ValidationError(
+                f'Не больше {settings.FOLLOW_BULK_MAX} авторов за раз')
+        return usernames
+
+
+class FollowBulkForm(UsernamesForm):
+    action = forms.ChoiceField(
+        label='Действие',
+        choices=(('follow', 'Подписаться'), ('unfollow', 'Отписаться')),
+    )
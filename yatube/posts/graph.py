@@ -0,0 +1,212 @@
+"""Граф подписок в памяти в формате CSR.
+
+Подписки пользователя u — targets[offsets[u]:offsets[u + 1]], id авторов
+по возрастанию. Два массива array('l') занимают 8 байт на подписку
+и 8 байт на пользователя, словарь множеств Python — на порядок больше.
+"""
+import heapq
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+
+from core.routers import primary_reads
+
+from .models import Follow, FollowSuggestion, UserStats
+from .utils import bump_feed_version
+
+
+class FollowGraph:
+    def __init__(self, offsets=None, targets=None):
+        self.offsets = offsets if offsets is not None else array('l', [0])
+        self.targets = targets if targets is not None else array('l')
+
+    @classmethod
+    def from_edges(cls, edges):
+        """Граф из пар (user_id, author_id), упорядоченных по обоим id."""
+        offsets, targets = array('l'), array('l')
+        for user_id, author_id in edges:
+            while len(offsets) <= user_id:
+                offsets.append(len(targets))
+            targets.append(author_id)
+        offsets.append(len(targets))
+        return cls(offsets, targets)
+
+    @property
+    def size(self):
+        """Число строк: наибольший id пользователя с подписками плюс один."""
+        return len(self.offsets) - 1
+
+    @property
+    def edges(self):
+        return len(self.targets)
+
+    @property
+    def nbytes(self):
+        return (
+            self.offsets.itemsize * len(self.offsets)
+            + self.targets.itemsize * len(self.targets)
+        )
+
+    def start(self, user_id):
+        if user_id < len(self.offsets):
+            return self.offsets[user_id]
+        return len(self.targets)
+
+    def following(self, user_id):
+        return self.targets[self.start(user_id):self.start(user_id + 1)]
+
+    def degree(self, user_id):
+        return self.start(user_id + 1) - self.start(user_id)
+
+    def follows(self, user_id, author_id):
+        lo, hi = self.start(user_id), self.start(user_id + 1)
+        index = bisect_left(self.targets, author_id, lo, hi)
+        return index < hi and self.targets[index] == author_id
+
+    def with_rows(self, rows):
+        """Новый граф, в котором подписки пользователей из rows заменены.
+
+        Диапазоны остальных пользователей копируются срезами массивов,
+        поэтому обновление стоит O(V) сдвигов смещений, а не O(E)
+        операций Python.
+        """
+        offsets, targets = array('l', [0]), array('l')
+        size = max(self.size, max(rows, default=-1) + 1)
+        copied = 0
+        for user_id in sorted(rows) + [size]:
+            lo, hi = self.start(copied), self.start(user_id)
+            shift = len(targets) - lo
+            targets.extend(self.targets[lo:hi])
+            offsets.extend(
+                self.start(node) + shift
+                for node in range(copied + 1, user_id + 1))
+            if user_id == size:
+                break
+            targets.extend(sorted(set(rows[user_id])))
+            offsets.append(len(targets))
+            copied = user_id + 1
+        return FollowGraph(offsets, targets)
+
+    def suggest(self, user_id, limit, max_degree):
+        """Друзья друзей: авторы, на которых подписаны авторы из подписок
+        пользователя, по числу таких подписок.
+
+        Подписки авторов, подписанных больше чем на max_degree человек,
+        не просматриваются: они почти ничего не говорят о вкусах
+        и стоили бы больше всех остальных вместе.
+        """
+        following = self.following(user_id)
+        scores = Counter()
+        for author_id in following:
+            if self.degree(author_id) <= max_degree:
+                scores.update(self.following(author_id))
+        scores.pop(user_id, None)
+        for author_id in following:
+            scores.pop(author_id, None)
+        return heapq.nlargest(
+            limit, scores.items(), key=lambda item: (item[1], -item[0]))
+
+
+def suggestions_key(user_id):
+    return f'follow_suggestions:{user_id}'
+
+
+def store_suggestions(graph, user_ids, batch_size=1000):
+    """Пересчитывает и сохраняет рекомендации пользователей user_ids."""
+    user_ids = list(user_ids)
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start:start + batch_size]
+        rows = [
+            FollowSuggestion(user_id=user_id, author_id=author_id,
+                             score=score)
+            for user_id in batch
+            for author_id, score in graph.suggest(
+                user_id,
+                settings.FOLLOW_SUGGESTIONS_COUNT,
+                settings.FOLLOW_SUGGESTIONS_MAX_DEGREE,
+            )
+        ]
+        with transaction.atomic():
+            FollowSuggestion.objects.filter(user_id__in=batch).delete()
+            FollowSuggestion.objects.bulk_create(rows)
+        cache.delete_many([suggestions_key(user_id) for user_id in batch])
+        bump_feed_version('suggestions')
+    return len(user_ids)
+
+
+def in_chunks(values, size=500):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def load_graph(chunk_size=10000):
+    """Строит граф из всех подписок; возвращает (граф, наибольший id
+    прочитанной подписки) для последующих refresh_graph."""
+    follows = Follow.objects.exclude(user=None).exclude(author=None)
+    last_pk = follows.aggregate(pk=Max('pk'))['pk'] or 0
+    edges = follows.filter(pk__lte=last_pk).order_by(
+        'user_id', 'author_id').values_list('user_id', 'author_id')
+    return FollowGraph.from_edges(edges.iterator(chunk_size)), last_pk
+
+
+def refresh_graph(graph, last_pk):
+    """Догоняет граф до базы; возвращает (граф, last_pk, изменённые id).
+
+    Новые подписки читаются по id больше last_pk. Отписки находятся
+    по расхождению счётчика following_count с длиной строки графа,
+    такие строки перечитываются целиком. Отписку, совпавшую с новой
+    подпиской того же пользователя, заметит только полная сборка.
+    """
+    rows = {}
+    follows = Follow.objects.exclude(user=None).exclude(author=None)
+    for pk, user_id, author_id in follows.filter(pk__gt=last_pk).order_by(
+            'pk').values_list('pk', 'user_id', 'author_id').iterator():
+        if user_id not in rows:
+            rows[user_id] = set(graph.following(user_id))
+        rows[user_id].add(author_id)
+        last_pk = pk
+    stale = [
+        user_id for user_id, count in UserStats.objects.values_list(
+            'pk', 'following_count').iterator()
+        if count != (
+            len(rows[user_id]) if user_id in rows
+            else graph.degree(user_id))
+    ]
+    for chunk in in_chunks(stale):
+        for user_id in chunk:
+            rows[user_id] = set()
+        for user_id, author_id in follows.filter(
+                user_id__in=chunk).values_list('user_id', 'author_id'):
+            rows[user_id].add(author_id)
+    return graph.with_rows(rows), last_pk, set(rows)
+
+
+def affected_users(user_ids):
+    """Пользователи, чьи рекомендации зависят от подписок user_ids:
+    они сами и их подписчики."""
+    affected = set(user_ids)
+    for chunk in in_chunks(user_ids):
+        affected.update(Follow.objects.filter(author_id__in=chunk).exclude(
+            user=None).values_list('user_id', flat=True))
+    return affected
+
+
+def get_suggestions(user_id):
+    """Имена рекомендованных авторов: кеш, при промахе — один запрос
+    по индексу (user, -score)."""
+    key = suggestions_key(user_id)
+    usernames = cache.get(key)
+    if usernames is None:
+        with primary_reads():
+            usernames = list(FollowSuggestion.objects.filter(
+                user_id=user_id).order_by('-score', 'author_id').values_list(
+                'author__username', flat=True)[
+                :settings.FOLLOW_SUGGESTIONS_SHOWN])
+        cache.set(key, usernames, settings.FOLLOW_SUGGESTIONS_TIMEOUT)
+    return usernames
@@ -0,0 +1,82 @@
+"""Обработка загруженных картинок постов с ограниченной памятью.
+
+Загрузка всегда лежит во временном файле (FILE_UPLOAD_HANDLERS), размеры
+читаются из заголовка без декодирования пикселей. JPEG декодируется
+сразу в уменьшенном масштабе (draft), остальные форматы — только если
+укладываются в IMAGE_MAX_PIXELS. Результат без метаданных, не больше
+IMAGE_MAX_SIDE по длинной стороне, пишется снова во временный файл.
+"""
+import os
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from PIL import Image, ImageOps
+
+
+def open_upload(upload):
+    """Открывает загрузку по пути временного файла или как поток;
+    Image.open читает только заголовок."""
+    if hasattr(upload, 'temporary_file_path'):
+        return Image.open(upload.temporary_file_path())
+    upload.seek(0)
+    return Image.open(upload)
+
+
+def output_format(image):
+    if image.mode in ('RGBA', 'LA') or 'transparency' in image.info:
+        return 'PNG'
+    return 'JPEG'
+
+
+def process_image(upload):
+    """Проверяет и перекодирует загрузку; возвращает новый файл.
+
+    ValidationError — если файл больше IMAGE_UPLOAD_MAX_SIZE, не читается
+    как картинка или не декодируется в пределах IMAGE_MAX_PIXELS.
+    """
+    if upload.size > settings.IMAGE_UPLOAD_MAX_SIZE:
+        raise ValidationError(
+            'Файл больше %(size)d МБ',
+            params={'size': settings.IMAGE_UPLOAD_MAX_SIZE // 2 ** 20},
+            code='file_too_large',
+        )
+    side = settings.IMAGE_MAX_SIDE
+    try:
+        with open_upload(upload) as source:
+            # Для JPEG декодер сразу уменьшит картинку в 2, 4 или 8 раз
+            # так, чтобы она не стала меньше итогового размера.
+            scale = min(1, side / max(source.size))
+            source.draft('RGB', tuple(round(n * scale) for n in source.size))
+            if source.width * source.height > settings.IMAGE_MAX_PIXELS:
+                raise ValidationError(
+                    'Картинка слишком большая: %(width)d×%(height)d',
+                    params={'width': source.width, 'height': source.height},
+                    code='too_many_pixels',
+                )
+            format = output_format(source)
+            mode = 'RGBA' if format == 'PNG' else 'RGB'
+            # Уменьшение на месте до поворота: квадратной рамке side×side
+            # ориентация не важна, а копии делаются уже с маленькой картинки.
+            source.thumbnail((side, side), Image.LANCZOS)
+            image = ImageOps.exif_transpose(source)
+            if image.mode != mode:
+                image = image.convert(mode)
+    except (OSError, Image.DecompressionBombError, SyntaxError):
+        # Битый или обрезанный файл: Pillow падает при чтении заголовка
+        # или уже при декодировании пикселей.
+        raise ValidationError(
+            'Не удалось прочитать картинку', code='invalid_image')
+    # Метаданные (EXIF, ICC, комментарии) не пишутся: PNG берёт их
+    # из info, а не только из параметров save.
+    image.info.clear()
+    name = os.path.splitext(os.path.basename(upload.name))[0]
+    processed = TemporaryUploadedFile(
+        f'{name}.{format.lower().replace("jpeg", "jpg")}',
+        f'image/{format.lower()}', 0, None)
+    image.save(
+        processed, format, optimize=True,
+        quality=settings.IMAGE_QUALITY, progressive=True)
+    processed.size = processed.tell()
+    processed.seek(0)
+    return processed
@@ -0,0 +1,65 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.graph import FollowGraph
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет сборку графа подписок и расчёт рекомендаций '
+        'на синтетических данных без базы'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--edges', type=int, default=1_000_000)
+        parser.add_argument('--users', type=int, default=100_000)
+        parser.add_argument('--sample', type=int, default=10_000)
+        parser.add_argument('--max-degree', type=int, default=1000)
+
+    def make_edges(self, rng, edges, users):
+        # Популярность авторов по закону Ципфа: немногие собирают
+        # большую часть подписок, как в живой соцсети.
+        weights = [1 / rank for rank in range(1, users + 1)]
+        authors = list(range(1, users + 1))
+        rng.shuffle(authors)
+        follows = set()
+        while len(follows) < edges:
+            user_ids = rng.choices(range(1, users + 1), k=edges)
+            author_ids = rng.choices(authors, weights=weights, k=edges)
+            follows.update(
+                pair for pair in zip(user_ids, author_ids)
+                if pair[0] != pair[1])
+        return sorted(follows)[:edges]
+
+    def timed(self, func, *args):
+        started = time.perf_counter()
+        result = func(*args)
+        return result, time.perf_counter() - started
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        edges = self.make_edges(rng, options['edges'], options['users'])
+        graph, seconds = self.timed(FollowGraph.from_edges, edges)
+        self.stdout.write(
+            f'Подписок: {graph.edges}, сборка {seconds:.2f} с, '
+            f'{graph.nbytes / 2 ** 20:.1f} МБ'
+        )
+        sample = rng.sample(range(1, options['users'] + 1), options['sample'])
+        started = time.perf_counter()
+        for user_id in sample:
+            graph.suggest(user_id, 20, options['max_degree'])
+        per_user = (time.perf_counter() - started) / len(sample)
+        self.stdout.write(
+            f'Рекомендации: {per_user * 1000:.2f} мс на пользователя, '
+            f'все {options["users"]} — около '
+            f'{per_user * options["users"]:.0f} с'
+        )
+        changed = {
+            user_id: rng.sample(range(1, options['users'] + 1), 10)
+            for user_id in rng.sample(range(1, options['users'] + 1), 1000)
+        }
+        _, seconds = self.timed(graph.with_rows, changed)
+        self.stdout.write(
+            f'Замена подписок 1000 пользователей: {seconds:.2f} с')
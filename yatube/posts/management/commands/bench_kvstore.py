@@ -0,0 +1,98 @@
+import io
+import tempfile
+import time
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries, transaction
+from django.template import engines
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from sorl.thumbnail import default
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import KVStore as DBKVStore
+
+from core.kvstore import KVStore
+from posts.models import Post
+from posts.thumbnails import ready_thumbnail
+
+User = get_user_model()
+FEED_PAGE = (
+    "{% for post in posts %}"
+    "{% include 'posts/includes/post_image.html' %}"
+    "{% endfor %}"
+)
+
+
+def make_image(name):
+    buffer = io.BytesIO()
+    Image.new('RGB', (1200, 800), 'steelblue').save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/png')
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает рендер страницы ленты с 10 картинками со стандартным '
+        'хранилищем метаданных sorl и с LRU перед кешем'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--renders', type=int, default=1000)
+
+    def measure(self, posts, renders, before_render=None):
+        page = engines['django'].from_string(FEED_PAGE)
+        queries = 0
+        elapsed = 0
+        for _ in range(renders):
+            if before_render:
+                before_render()
+            reset_queries()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                page.render({'posts': posts})
+                elapsed += time.perf_counter() - started
+            queries += len(captured)
+        return elapsed / renders * 1000, queries / renders
+
+    def handle(self, *args, **options):
+        prefix = uuid.uuid4().hex
+        with tempfile.TemporaryDirectory() as media, override_settings(
+            MEDIA_ROOT=media, TASKS_ALWAYS_EAGER=True,
+        ), transaction.atomic():
+            author = User.objects.create_user(username=f'bench-{prefix}')
+            posts = [
+                Post.objects.create(
+                    author=author, text='Пост',
+                    image=make_image(f'{prefix}-{i}.png'))
+                for i in range(10)
+            ]
+            keys = [
+                add_prefix(ready_thumbnail(post.image, 'card').key)
+                for post in posts
+            ]
+            stock, layered = DBKVStore(), KVStore()
+
+            def drop_shared_cache():
+                stock.cache.delete_many(keys)
+
+            scenarios = (
+                ('sorl cached_db, кеш пуст', stock, drop_shared_cache),
+                ('sorl cached_db, ключи в кеше', stock, None),
+                ('LRU + кеш, ключи в LRU', layered, None),
+            )
+            for title, store, before_render in scenarios:
+                default.kvstore._wrapped = store
+                KVStore.local.clear()
+                KVStore.stats.clear()
+                self.measure(posts, 1)
+                ms, queries = self.measure(
+                    posts, options['renders'], before_render)
+                self.stdout.write(
+                    f'{title}: {ms:.3f} мс и {queries:.1f} запросов '
+                    f'к базе на страницу')
+            self.stdout.write(f'Счётчики LRU + кеш: {dict(KVStore.stats)}')
+            stock.cache.delete_many(keys)
+            transaction.set_rollback(True)
@@ -0,0 +1,105 @@
+import itertools
+import os
+import random
+import sqlite3
+import string
+import tempfile
+import time
+from contextlib import closing
+
+from django.core.management.base import BaseCommand
+
+from posts.search import fts_query
+
+WORDS = 20000
+WORDS_PER_POST = 40
+BATCH = 10000
+
+
+def make_vocabulary(rng):
+    letters = 'абвгдежзиклмнопрстуфхцчшэюя' + string.ascii_lowercase
+    return [
+        ''.join(rng.choice(letters) for _ in range(rng.randint(4, 10)))
+        for _ in range(WORDS)
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает поиск по постам через FTS5 с LIKE-сканированием '
+        'на синтетической базе'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1_000_000)
+        parser.add_argument('--queries', type=int, default=20)
+
+    def fill(self, connection, posts, vocabulary, rng):
+        connection.execute(
+            'CREATE TABLE posts_post (id INTEGER PRIMARY KEY, text TEXT)')
+        connection.execute(
+            "CREATE VIRTUAL TABLE posts_post_fts USING fts5(text, "
+            "content='posts_post', content_rowid='id', "
+            "tokenize='unicode61 remove_diacritics 2')"
+        )
+        # Частота слов по закону Ципфа, как в живом тексте.
+        weights = list(itertools.accumulate(
+            1 / rank for rank in range(1, WORDS + 1)))
+        for start in range(0, posts, BATCH):
+            rows = [
+                (' '.join(rng.choices(
+                    vocabulary, cum_weights=weights, k=WORDS_PER_POST)),)
+                for _ in range(min(BATCH, posts - start))
+            ]
+            connection.executemany(
+                'INSERT INTO posts_post (text) VALUES (?)', rows)
+        connection.execute(
+            "INSERT INTO posts_post_fts (posts_post_fts) VALUES ('rebuild')")
+        connection.commit()
+
+    def timed(self, connection, sql, params):
+        started = time.perf_counter()
+        connection.execute(sql, params).fetchall()
+        return time.perf_counter() - started
+
+    def compare(self, connection, title, terms):
+        like = fts = 0
+        for term in terms:
+            like += self.timed(
+                connection,
+                'SELECT id FROM posts_post WHERE text LIKE ? '
+                'ORDER BY id DESC LIMIT 10',
+                [f'%{term}%'],
+            )
+            fts += self.timed(
+                connection,
+                'SELECT rowid FROM posts_post_fts '
+                'WHERE posts_post_fts MATCH ? ORDER BY rank LIMIT 10',
+                [fts_query(term)],
+            )
+        self.stdout.write(
+            f'{title}: LIKE {like / len(terms) * 1000:.1f} мс, '
+            f'FTS5 {fts / len(terms) * 1000:.1f} мс на запрос'
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        vocabulary = make_vocabulary(rng)
+        # Частые слова LIKE находит, просмотрев начало таблицы,
+        # редкие — только полным сканированием.
+        term_sets = {
+            'частые слова': rng.sample(
+                vocabulary[100:1000], options['queries']),
+            'редкие слова': rng.sample(
+                vocabulary[15000:], options['queries']),
+        }
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'search.sqlite3')
+            with closing(sqlite3.connect(path)) as connection:
+                started = time.perf_counter()
+                self.fill(connection, options['posts'], vocabulary, rng)
+                self.stdout.write(
+                    f'Постов: {options["posts"]}, заполнение '
+                    f'{time.perf_counter() - started:.1f} с')
+                for title, terms in term_sets.items():
+                    self.compare(connection, title, terms)
@@ -0,0 +1,83 @@
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from posts.images import process_image
+
+
+def naive(path):
+    # Как sorl при первой миниатюре: декодирует оригинал целиком.
+    with Image.open(path) as image:
+        image.load()
+        image.thumbnail((960, 960))
+
+
+def pipeline(path):
+    upload = TemporaryUploadedFile(
+        os.path.basename(path), 'image/jpeg', os.path.getsize(path), None)
+    with open(path, 'rb') as source:
+        for chunk in iter(lambda: source.read(2 ** 20), b''):
+            upload.write(chunk)
+    try:
+        process_image(upload)
+    except ValidationError as error:
+        return error.code
+    return 'ok'
+
+
+def run(func, path, queue):
+    started = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    clock = time.perf_counter()
+    result = func(path)
+    elapsed = time.perf_counter() - clock
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((result, elapsed, (peak - started) / 1024))
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет пиковую память обработки больших загрузок: полное '
+        'декодирование против posts.images.process_image'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--width', type=int, default=8000)
+        parser.add_argument('--height', type=int, default=6000)
+
+    def measure(self, func, path):
+        # Каждый замер в свежем процессе: ru_maxrss только растёт.
+        context = multiprocessing.get_context('fork')
+        queue = context.Queue()
+        process = context.Process(target=run, args=(func, path, queue))
+        process.start()
+        result = queue.get()
+        process.join()
+        return result
+
+    def handle(self, *args, **options):
+        size = (options['width'], options['height'])
+        with tempfile.TemporaryDirectory() as directory:
+            image = Image.linear_gradient('L').resize(size).convert('RGB')
+            files = []
+            for format in ('JPEG', 'PNG'):
+                path = os.path.join(directory, f'big.{format.lower()}')
+                image.save(path, format)
+                files.append((format, path))
+            del image
+            for format, path in files:
+                for title, func in (
+                        ('полное декодирование', naive),
+                        ('process_image', pipeline)):
+                    result, elapsed, peak = self.measure(func, path)
+                    self.stdout.write(
+                        f'{format} {size[0]}×{size[1]}, {title}: '
+                        f'+{peak:.0f} МБ пиковой памяти, '
+                        f'{elapsed * 1000:.0f} мс'
+                        + (f' ({result})' if result else ''))
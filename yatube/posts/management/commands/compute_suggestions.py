@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.graph import (affected_users, load_graph, refresh_graph,
+                         store_suggestions)
+
+
+class Command(BaseCommand):
+    help = (
+        'Строит граф подписок и сохраняет рекомендации «кого почитать» '
+        'для каждого пользователя'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            help='Догонять граф и пересчитывать затронутых пользователей '
+                 'каждые INTERVAL секунд',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        graph, last_pk = load_graph()
+        built = time.monotonic()
+        users = [
+            user_id for user_id in range(graph.size) if graph.degree(user_id)]
+        store_suggestions(graph, users)
+        self.stdout.write(
+            f'Подписок: {graph.edges}, граф {graph.nbytes / 2 ** 20:.1f} МБ '
+            f'за {built - started:.1f} с; рекомендации для {len(users)} '
+            f'пользователей за {time.monotonic() - built:.1f} с'
+        )
+        while options['interval']:
+            time.sleep(options['interval'])
+            graph, last_pk, changed = refresh_graph(graph, last_pk)
+            if changed:
+                users = store_suggestions(graph, affected_users(changed))
+                self.stdout.write(f'Пересчитано пользователей: {users}')
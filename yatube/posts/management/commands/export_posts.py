@@ -0,0 +1,25 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.dumps import export_ndjson
+
+
+class Command(BaseCommand):
+    help = 'Выгружает пользователей, сообщества, посты, комментарии ' \
+           'и подписки в NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл дампа или - для stdout')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        if options['path'] == '-':
+            count = export_ndjson(sys.stdout)
+        else:
+            with open(options['path'], 'w', encoding='utf-8') as stream:
+                count = export_ndjson(stream)
+        seconds = time.monotonic() - started
+        self.stderr.write(
+            f'Выгружено записей: {count}, {count / seconds:.0f} строк/с')
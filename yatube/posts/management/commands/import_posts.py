@@ -0,0 +1,70 @@
+import json
+import os
+import time
+from contextlib import suppress
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from posts.counters import recount
+from posts.dumps import Importer
+from posts.feeds import rebuild_timelines
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает NDJSON-дамп export_posts пачками. После сбоя повторный '
+        'запуск продолжает с контрольной точки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл дампа')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл контрольной точки, по умолчанию <path>.checkpoint',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Начать заново, не читая контрольную точку',
+        )
+
+    def read_checkpoint(self, path, restart):
+        if restart or not os.path.exists(path):
+            return None
+        with open(path, encoding='utf-8') as stream:
+            checkpoint = json.load(stream)
+        self.stdout.write(f'Продолжаем с байта {checkpoint["offset"]}')
+        return checkpoint
+
+    def handle(self, *args, **options):
+        checkpoint_path = (
+            options['checkpoint'] or f'{options["path"]}.checkpoint')
+        importer = Importer(
+            options['batch_size'],
+            self.read_checkpoint(checkpoint_path, options['restart']),
+        )
+        started = time.monotonic()
+
+        def on_batch(importer):
+            with open(checkpoint_path, 'w', encoding='utf-8') as stream:
+                json.dump(importer.checkpoint, stream)
+            rate = importer.loaded / (time.monotonic() - started)
+            self.stdout.write(
+                f'Загружено {importer.loaded}, {rate:.0f} строк/с')
+
+        with open(options['path'], 'rb') as stream:
+            importer.run(stream, on_batch)
+        self.stdout.write('Пересчёт счётчиков и лент подписок')
+        recount()
+        rebuild_timelines()
+        cache.clear()
+        # Пустой дамп не доходит до on_batch, и контрольной точки нет.
+        with suppress(FileNotFoundError):
+            os.remove(checkpoint_path)
+        seconds = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено {importer.loaded}, пропущено {importer.skipped} '
+            f'за {seconds:.1f} с'
+        ))
@@ -0,0 +1,54 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:08
+
+from django.db import migrations, models
+from django.utils.text import Truncator
+import django.db.models.deletion
+
+
+def fill_group_stats(apps, schema_editor):
+    Group = apps.get_model('posts', 'Group')
+    GroupStats = apps.get_model('posts', 'GroupStats')
+    models_by_age = (
+        apps.get_model('posts', 'Post'),
+        apps.get_model('posts', 'ArchivedPost'),
+    )
+    for group_id in Group.objects.values_list('pk', flat=True).iterator():
+        stats = GroupStats(group_id=group_id)
+        for model in models_by_age:
+            posts = model.objects.filter(group_id=group_id)
+            stats.posts_count += posts.count()
+            last = posts.order_by('-pub_date', '-pk').first()
+            if last is not None and stats.last_post_id is None:
+                stats.last_post_id = last.pk
+                stats.last_pub_date = last.pub_date
+                stats.last_post_text = Truncator(last.text).chars(200)
+        stats.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupStats',
+            fields=[
+                ('group', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='posts.Group', verbose_name='Сообщество')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Число постов')),
+                ('last_post_id', models.IntegerField(null=True, verbose_name='Последний пост')),
+                ('last_pub_date', models.DateTimeField(null=True, verbose_name='Дата последнего поста')),
+                ('last_post_text', models.CharField(blank=True, max_length=200, verbose_name='Начало последнего поста')),
+            ],
+            options={
+                'verbose_name': 'Счётчики сообщества',
+                'verbose_name_plural': 'Счётчики сообществ',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='group',
+            index=models.Index(fields=['title'], name='group_title_idx'),
+        ),
+        migrations.RunPython(fill_group_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:25
+
+from collections import Counter
+
+from django.db import migrations, models
+from django.db.models import Count
+import core.storage
+
+
+def fill_stored_images(apps, schema_editor):
+    StoredImage = apps.get_model('posts', 'StoredImage')
+    refs = Counter()
+    for model in ('Post', 'ArchivedPost'):
+        refs.update(dict(
+            apps.get_model('posts', model).objects.exclude(image='')
+            .order_by().values('image').annotate(total=Count('pk'))
+            .values_list('image', 'total')))
+    StoredImage.objects.bulk_create(
+        StoredImage(name=name, refs=total) for name, total in refs.items())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0020_follow_suggestions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredImage',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False, verbose_name='Имя файла')),
+                ('refs', models.PositiveIntegerField(default=0, verbose_name='Число ссылок')),
+            ],
+            options={
+                'verbose_name': 'Файл картинки',
+                'verbose_name_plural': 'Файлы картинок',
+            },
+        ),
+        migrations.AlterField(
+            model_name='archivedpost',
+            name='image',
+            field=models.ImageField(blank=True, storage=core.storage.ContentAddressedStorage(), upload_to='posts/', verbose_name='Картинка'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, help_text='Загрузите картинку', storage=core.storage.ContentAddressedStorage(), upload_to='posts/', verbose_name='Картинка'),
+        ),
+        migrations.RunPython(fill_stored_images, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,12 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from core.storage import ContentAddressedStorage
+
 User = get_user_model()
+# Картинки постов именуются по содержимому: одинаковые загрузки хранятся
+# один раз, число ссылок на файл ведёт StoredImage.
+post_images = ContentAddressedStorage()
 
 
 class Group(models.Model):
@@ -24,6 +29,9 @@ class Group(models.Model):
     class Meta:
         verbose_name = 'Сообщество'
         verbose_name_plural = 'Сообщества'
+        indexes = [
+            models.Index(fields=('title',), name='group_title_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -39,6 +47,10 @@ class Post(models.Model):
         auto_now_add=True,
         db_index=True,
     )
+    updated = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True,
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -58,18 +70,42 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=post_images,
         blank=True,
         help_text='Загрузите картинку',
     )
+    comments_count = models.PositiveIntegerField(
+        'Число комментариев',
+        default=0,
+        editable=False,
+    )
+
+    is_archived = False
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(
+                fields=('author', '-pub_date'), name='post_author_date_idx'),
+            models.Index(
+                fields=('group', '-pub_date'), name='post_group_date_idx'),
+        ]
 
     def __str__(self):
         return (self.text[:20])
 
+    def save(self, *args, **kwargs):
+        # Счётчик комментариев меняет только shift_comments_count запросом
+        # UPDATE: полное сохранение вернуло бы устаревшее значение из памяти.
+        if (not self._state.adding and kwargs.get('update_fields') is None
+                and not kwargs.get('force_insert')):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'comments_count']
+        super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     post = models.ForeignKey(
@@ -107,6 +143,88 @@ class Comment(models.Model):
         ordering = ('-created',)
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                fields=('post', '-created'), name='comment_post_created_idx'),
+        ]
+
+    def __str__(self):
+        return (self.text[:20])
+
+
+class ArchivedPost(models.Model):
+    """Пост старше ARCHIVE_AFTER_DAYS, перенесённый из Post с тем же id."""
+    id = models.IntegerField(primary_key=True)
+    text = models.TextField('Текст поста')
+    pub_date = models.DateTimeField('Дата публикации')
+    updated = models.DateTimeField('Дата изменения')
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Автор',
+        related_name='archived_posts'
+    )
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.SET_NULL,
+        related_name='archived_posts',
+        verbose_name='Сообщество',
+        blank=True,
+        null=True,
+    )
+    image = models.ImageField(
+        'Картинка', upload_to='posts/', storage=post_images, blank=True)
+    comments_count = models.PositiveIntegerField(
+        'Число комментариев', default=0)
+
+    is_archived = True
+
+    class Meta:
+        ordering = ('-pub_date',)
+        verbose_name = 'Архивный пост'
+        verbose_name_plural = 'Архивные посты'
+        indexes = [
+            models.Index(
+                fields=('-pub_date',), name='archived_post_date_idx'),
+            models.Index(
+                fields=('author', '-pub_date'),
+                name='archived_author_date_idx'),
+            models.Index(
+                fields=('group', '-pub_date'),
+                name='archived_group_date_idx'),
+        ]
+
+    def __str__(self):
+        return (self.text[:20])
+
+
+class ArchivedComment(models.Model):
+    id = models.IntegerField(primary_key=True)
+    post = models.ForeignKey(
+        ArchivedPost,
+        on_delete=models.CASCADE,
+        related_name='comments',
+        verbose_name='Пост',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        related_name='archived_comments',
+        verbose_name='Автор комментария',
+    )
+    text = models.TextField('Текст комментария', null=True)
+    created = models.DateTimeField('Дата публикации комментария')
+
+    class Meta:
+        ordering = ('-created',)
+        verbose_name = 'Архивный комментарий'
+        verbose_name_plural = 'Архивные комментарии'
+        indexes = [
+            models.Index(
+                fields=('post', '-created'),
+                name='archived_comment_post_idx'),
+        ]
 
     def __str__(self):
         return (self.text[:20])
@@ -131,3 +249,141 @@ class Follow(models.Model):
     class Meta:
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'author'), name='unique_follow'),
+        ]
+
+
+class UserStats(models.Model):
+    """Счётчики пользователя, обновляемые при записи."""
+    user = models.OneToOneField(
+        User,
+        related_name='stats',
+        verbose_name='Пользователь',
+        primary_key=True,
+        on_delete=models.CASCADE,
+    )
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'Число подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Число подписок', default=0)
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+
+    def __str__(self):
+        return str(self.user_id)
+
+
+class StoredImage(models.Model):
+    """Файл картинки в хранилище и число постов (с архивом), которые
+    на него ссылаются."""
+    name = models.CharField('Имя файла', max_length=100, primary_key=True)
+    refs = models.PositiveIntegerField('Число ссылок', default=0)
+
+    class Meta:
+        verbose_name = 'Файл картинки'
+        verbose_name_plural = 'Файлы картинок'
+
+    def __str__(self):
+        return self.name
+
+
+class GroupStats(models.Model):
+    """Число постов и последний пост сообщества, обновляемые при записи."""
+    group = models.OneToOneField(
+        Group,
+        related_name='stats',
+        verbose_name='Сообщество',
+        primary_key=True,
+        on_delete=models.CASCADE,
+    )
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
+    # Не внешний ключ: последний пост может уйти в архив с тем же id.
+    last_post_id = models.IntegerField('Последний пост', null=True)
+    last_pub_date = models.DateTimeField(
+        'Дата последнего поста', null=True)
+    last_post_text = models.CharField(
+        'Начало последнего поста', max_length=200, blank=True)
+
+    class Meta:
+        verbose_name = 'Счётчики сообщества'
+        verbose_name_plural = 'Счётчики сообществ'
+
+    def __str__(self):
+        return str(self.group_id)
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        related_name='timeline',
+        verbose_name='Читатель',
+        on_delete=models.CASCADE,
+    )
+    post = models.ForeignKey(
+        Post,
+        related_name='timeline_entries',
+        verbose_name='Пост',
+        on_delete=models.CASCADE,
+    )
+    author = models.ForeignKey(
+        User,
+        related_name='+',
+        verbose_name='Автор поста',
+        on_delete=models.CASCADE,
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        ordering = ('-pub_date',)
+        verbose_name = 'Запись ленты подписок'
+        verbose_name_plural = 'Записи ленты подписок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'post'), name='unique_timeline_entry'),
+        ]
+        indexes = [
+            models.Index(
+                fields=('user', '-pub_date'), name='timeline_user_date_idx'),
+            models.Index(
+                fields=('user', 'author'), name='timeline_user_author_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id}: {self.post_id}'
+
+
+class FollowSuggestion(models.Model):
+    """Автор, которого стоит предложить пользователю: на него подписаны
+    score авторов из подписок пользователя."""
+    user = models.ForeignKey(
+        User,
+        related_name='follow_suggestions',
+        verbose_name='Пользователь',
+        on_delete=models.CASCADE,
+    )
+    author = models.ForeignKey(
+        User,
+        related_name='+',
+        verbose_name='Автор',
+        on_delete=models.CASCADE,
+    )
+    score = models.PositiveIntegerField('Общих подписок')
+
+    class Meta:
+        verbose_name = 'Рекомендация подписки'
+        verbose_name_plural = 'Рекомендации подписок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'author'), name='unique_follow_suggestion'),
+        ]
+        indexes = [
+            models.Index(
+                fields=('user', '-score'), name='suggestion_user_score_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id} -> {self.author_id}'
@@ -0,0 +1,137 @@
+import base64
+import binascii
+import re
+
+from django.db import connection
+
+from .utils import CursorPage
+
+FTS_TABLE = 'posts_post_fts'
+
+# Внешнее содержимое: индекс хранит только токены, текст берётся
+# из posts_post по rowid = id.
+FTS_TRIGGERS = (
+    f'''CREATE TRIGGER IF NOT EXISTS posts_post_fts_insert
+    AFTER INSERT ON posts_post BEGIN
+        INSERT INTO {FTS_TABLE} (rowid, text) VALUES (new.id, new.text);
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS posts_post_fts_delete
+    AFTER DELETE ON posts_post BEGIN
+        INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+    END''',
+    f'''CREATE TRIGGER IF NOT EXISTS posts_post_fts_update
+    AFTER UPDATE OF text ON posts_post BEGIN
+        INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        INSERT INTO {FTS_TABLE} (rowid, text) VALUES (new.id, new.text);
+    END''',
+)
+
+WORD_RE = re.compile(r'\w+')
+
+
+def uses_fts(using=connection):
+    return using.vendor == 'sqlite'
+
+
+def install_triggers(using=connection):
+    """Создаёт триггеры индекса, если их нет.
+
+    SQLite пересоздаёт таблицу posts_post при части миграций, и
+    триггеры удаляются вместе со старой таблицей.
+    """
+    if not uses_fts(using):
+        return
+    with using.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s",
+            [FTS_TABLE],
+        )
+        if cursor.fetchone() is None:
+            return
+        for statement in FTS_TRIGGERS:
+            cursor.execute(statement)
+
+
+def fts_query(text):
+    """Запрос FTS5 из пользовательского ввода: каждое слово в кавычках,
+    последнее — как префикс; операторы FTS5 не интерпретируются."""
+    words = WORD_RE.findall(text.lower())
+    if not words:
+        return ''
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def filter_matching(queryset, text):
+    """Посты queryset, подходящие под запрос, без ранжирования."""
+    return queryset.extra(
+        where=[
+            f'posts_post.id IN (SELECT rowid FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s)'
+        ],
+        params=[fts_query(text)],
+    )
+
+
+def search_posts(queryset, text):
+    """Посты, подходящие под запрос, с релевантностью rank:
+    чем меньше, тем выше. Без FTS5 — поиск подстроки, новые первыми."""
+    if not uses_fts():
+        return queryset.filter(text__icontains=text).extra(
+            select={'rank': '0'})
+    if not fts_query(text):
+        return queryset.none().extra(select={'rank': '0'})
+    return queryset.extra(
+        select={'rank': f'{FTS_TABLE}.rank'},
+        tables=[FTS_TABLE],
+        where=[
+            f'{FTS_TABLE}.rowid = posts_post.id',
+            f'{FTS_TABLE} MATCH %s',
+        ],
+        params=[fts_query(text)],
+    )
+
+
+class SearchPaginator:
+    """Пагинация результатов поиска по ключу (rank, id).
+
+    Страницы идут только вперёд: курсор хранит ключ последней записи.
+    """
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+
+    def encode_cursor(self, obj):
+        raw = f'{obj.rank!r}|{obj.pk}'
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            raw = base64.urlsafe_b64decode(padded.encode()).decode()
+            rank, pk = raw.split('|')
+            return float(rank), int(pk)
+        except (ValueError, binascii.Error):
+            return None
+
+    def get_page(self, cursor=None):
+        queryset = self.queryset.order_by('rank', '-pk')
+        decoded = self.decode_cursor(cursor) if cursor else None
+        if decoded is not None:
+            rank = queryset.query.extra_select['rank'][0]
+            queryset = queryset.extra(
+                where=[
+                    f'({rank} > %s OR ({rank} = %s AND posts_post.id < %s))'
+                ],
+                params=[decoded[0], decoded[0], decoded[1]],
+            )
+        rows = list(queryset[:self.per_page + 1])
+        next_cursor = None
+        if len(rows) > self.per_page:
+            rows = rows[:self.per_page]
+            next_cursor = self.encode_cursor(rows[-1])
+        return CursorPage(rows, self, next_cursor)
@@ -0,0 +1,250 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.db.models.signals import (post_delete, post_migrate, post_save,
+                                      pre_save)
+from django.urls import reverse
+from django.utils import timezone
+
+from core.decorators import purge_paths
+from core.signals import receiver
+from core.tasks import defer
+
+from . import feeds, follows, search, thumbnails
+from .conditional import (author_feed, group_feed, group_slug_paths,
+                          post_modified_key)
+from .counters import (drop_group_post, push_group_post, shift_comments_count,
+                       shift_group_stats, shift_image_refs, shift_user_stats)
+from .models import (ArchivedPost, Comment, Follow, Group, GroupStats, Post,
+                     UserStats)
+from .utils import bump_feed_version, feed_count_key
+
+User = get_user_model()
+
+
+def shift_counts(keys, delta):
+    """Сдвигает закешированные счётчики; отсутствующие ключи пропускает."""
+    for key in keys:
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            pass
+
+
+def post_count_keys(author_id, group_id):
+    # Ленты подписчиков сбрасывает фоновая задача: их число не ограничено.
+    keys = [feed_count_key('all'), feed_count_key('author', author_id)]
+    if group_id is not None:
+        keys.append(feed_count_key('group', group_id))
+    return keys
+
+
+@receiver(pre_save, sender=Post)
+def fill_raw_post_updated(sender, instance, raw, **kwargs):
+    # loaddata сохраняет поля как есть, без auto_now, а в старых
+    # фикстурах поля updated нет.
+    if raw and instance.updated is None:
+        instance.updated = instance.pub_date or timezone.now()
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_group(sender, instance, **kwargs):
+    if instance.pk is not None and not instance._state.adding:
+        instance._previous_group_id, instance._previous_image = (
+            Post.objects.filter(pk=instance.pk).values_list(
+                'group_id', 'image').first() or (None, None))
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, **kwargs):
+    if created:
+        shift_counts(post_count_keys(instance.author_id, instance.group_id), 1)
+        return
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    if previous_group_id != instance.group_id:
+        if previous_group_id is not None:
+            shift_counts([feed_count_key('group', previous_group_id)], -1)
+        if instance.group_id is not None:
+            shift_counts([feed_count_key('group', instance.group_id)], 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    shift_counts(post_count_keys(instance.author_id, instance.group_id), -1)
+    defer(feeds.reset_follower_counts, instance.author_id)
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, **kwargs):
+    # И для loaddata: иначе сдвиги счётчиков F() не найдут строки.
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def count_author_post(sender, instance, created, **kwargs):
+    if created:
+        shift_user_stats(instance.author_id, 'posts_count', 1)
+
+
+@receiver(post_delete, sender=Post)
+def uncount_author_post(sender, instance, **kwargs):
+    shift_user_stats(instance.author_id, 'posts_count', -1)
+
+
+@receiver(post_save, sender=Group)
+def create_group_stats(sender, instance, created, **kwargs):
+    # И для loaddata: иначе сдвиги счётчиков F() не найдут строки.
+    if created:
+        GroupStats.objects.get_or_create(group=instance)
+
+
+@receiver(post_save, sender=Post)
+def count_group_post(sender, instance, created, **kwargs):
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    if not created and previous_group_id != instance.group_id:
+        shift_group_stats(previous_group_id, -1)
+        drop_group_post(instance.pk, previous_group_id)
+    if created or previous_group_id != instance.group_id:
+        shift_group_stats(instance.group_id, 1)
+    push_group_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def uncount_group_post(sender, instance, **kwargs):
+    shift_group_stats(instance.group_id, -1)
+    drop_group_post(instance.pk, instance.group_id)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, **kwargs):
+    if created:
+        shift_comments_count(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, **kwargs):
+    shift_comments_count(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def apply_follow(sender, instance, created, **kwargs):
+    if created:
+        follows.followed(instance.user_id, [instance.author_id])
+
+
+@receiver(post_delete, sender=Follow)
+def apply_unfollow(sender, instance, **kwargs):
+    follows.unfollowed(instance.user_id, [instance.author_id])
+
+
+@receiver(post_save, sender=Post)
+def fan_out_saved_post(sender, instance, created, **kwargs):
+    feeds.push_recent_post(instance)
+    if created:
+        defer(feeds.fan_out_post, instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def generate_post_thumbnails(sender, instance, **kwargs):
+    image = instance.image.name
+    if image and image != getattr(instance, '_previous_image', None):
+        defer(thumbnails.generate_thumbnails, image)
+
+
+@receiver(post_save, sender=Post)
+def count_image_refs(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    previous = None if created else getattr(instance, '_previous_image', None)
+    if instance.image.name != previous:
+        shift_image_refs(instance.image.name, 1)
+        shift_image_refs(previous, -1)
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=ArchivedPost)
+def uncount_image_refs(sender, instance, **kwargs):
+    # Архивные посты тоже ссылаются на файл; перенос в архив идёт
+    # при заглушённых сигналах и ссылок не меняет.
+    shift_image_refs(instance.image.name, -1)
+
+
+@receiver(post_delete, sender=Post)
+def drop_deleted_post(sender, instance, **kwargs):
+    feeds.drop_recent_post(instance)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def bump_index_version(sender, **kwargs):
+    # Удаление сообщества обнуляет Post.group запросом UPDATE без
+    # сигналов Post, поэтому версию сбрасывает и оно.
+    bump_feed_version('index')
+
+
+def group_slugs(group_ids):
+    return list(Group.objects.filter(pk__in=group_ids).values_list(
+        'slug', flat=True))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def purge_post_pages(sender, instance, **kwargs):
+    """Сбрасывает гостевые страницы и версии ETag ленты автора
+    и сообществ поста."""
+    paths = {
+        reverse('posts:index'),
+        reverse('posts:post_detail', args=[instance.pk]),
+        reverse('posts:profile', args=[instance.author.username]),
+    }
+    bump_feed_version(author_feed(instance.author.username))
+    group_ids = {
+        instance.group_id, getattr(instance, '_previous_group_id', None)}
+    if group_ids - {None}:
+        slugs = group_slugs(group_ids - {None})
+        for slug in slugs:
+            bump_feed_version(group_feed(slug))
+        paths.add(reverse('posts:group_index'))
+        paths.update(group_slug_paths(slugs))
+    purge_paths(paths)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def reset_post_modified(sender, instance, **kwargs):
+    post_id = instance.pk if sender is Post else instance.post_id
+    if sender is Comment:
+        # Удаление или правка старого комментария не двигают максимум
+        # created вперёд — время изменения страницы сдвигает updated.
+        Post.objects.filter(pk=post_id).update(updated=timezone.now())
+    cache.delete(post_modified_key(post_id))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def purge_comment_pages(sender, instance, **kwargs):
+    if instance.post_id is not None:
+        purge_paths([
+            reverse('posts:post_detail', args=[instance.post_id]),
+            reverse('posts:post_comments', args=[instance.post_id]),
+        ])
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def purge_group_pages(sender, instance, **kwargs):
+    bump_feed_version(group_feed(instance.slug))
+    purge_paths(
+        [reverse('posts:index'), reverse('posts:group_index')]
+        + group_slug_paths([instance.slug]))
+
+
+@receiver(post_migrate)
+def install_search_triggers(sender, using, **kwargs):
+    if sender.name == 'posts':
+        search.install_triggers(connections[using])
@@ -0,0 +1,17 @@
+from django import template
+
+from ..thumbnails import aspect_ratio, ready_picture
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_picture(image, preset):
+    """{% post_picture post.image 'card' as picture %}: варианты для
+    <picture> с srcset из готовых или None, пока их нет."""
+    return ready_picture(image, preset)
+
+
+@register.simple_tag
+def preset_aspect_ratio(preset):
+    return aspect_ratio(preset) or ''
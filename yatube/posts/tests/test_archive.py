@@ -0,0 +1,144 @@
+import datetime
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import (ArchivedComment, ArchivedPost, Comment, Follow, Group,
+                      Post, TimelineEntry, UserStats)
+from ..utils import feed_count_key, feed_version
+
+User = get_user_model()
+
+
+class ArchiveTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='archive-group', description='-')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        now = timezone.now()
+        cls.posts = []
+        for i in range(25):
+            post = Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {i}')
+            # Пять самых старых постов опубликованы два года назад.
+            age = datetime.timedelta(days=800 - i if i < 5 else 25 - i)
+            Post.objects.filter(pk=post.pk).update(pub_date=now - age)
+            cls.posts.append(post)
+        cls.old_post = cls.posts[0]
+        cls.comment = Comment.objects.create(
+            post=cls.old_post, author=cls.reader, text='Старый комментарий')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def archive(self):
+        out = StringIO()
+        call_command('archive_posts', days=365, batch_size=2, stdout=out)
+        return out.getvalue()
+
+    def page_ids(self, client, url, page):
+        response = client.get(url, {'page': page})
+        return [post.pk for post in response.context['page_obj']]
+
+    def test_command_moves_old_rows(self):
+        """Команда переносит старые посты с комментариями в архив."""
+        self.assertIn('Перенесено в архив постов: 5', self.archive())
+        old_ids = [post.pk for post in self.posts[:5]]
+        self.assertFalse(Post.objects.filter(pk__in=old_ids).exists())
+        self.assertEqual(
+            sorted(ArchivedPost.objects.values_list('pk', flat=True)),
+            old_ids)
+        archived = ArchivedComment.objects.get(pk=self.comment.pk)
+        self.assertEqual(archived.post_id, self.old_post.pk)
+        self.assertEqual(archived.post.comments_count, 1)
+        self.assertFalse(TimelineEntry.objects.filter(post_id__in=old_ids))
+        self.assertEqual(self.archive().split()[-1], '0')
+
+    def test_counters_unchanged(self):
+        """Архивирование не меняет счётчики и число постов в лентах."""
+        def feed_count():
+            response = self.authorized_client.get(reverse('posts:index'))
+            return response.context['page_obj'].paginator.count
+
+        count = feed_count()
+        self.archive()
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).posts_count, 25)
+        self.assertEqual(feed_count(), count)
+        cache.clear()
+        self.assertEqual(feed_count(), count)
+        out = StringIO()
+        call_command('recount', stdout=out)
+        self.assertIn('Исправлено значений: 0', out.getvalue())
+
+    def test_follower_feed_caches_reset(self):
+        """Подписчики, чьи строки ленты ушли в архив, получают новую
+        версию ленты и пересчёт числа постов."""
+        count_key = feed_count_key('follower', self.reader.pk)
+        cache.set(count_key, 99)
+        version = feed_version(f'follow:{self.reader.pk}')
+        self.archive()
+        self.assertIsNone(cache.get(count_key))
+        self.assertNotEqual(
+            feed_version(f'follow:{self.reader.pk}'), version)
+
+    def test_post_detail_reads_archive(self):
+        """Страница и комментарии архивного поста доступны по старому
+        адресу, но комментировать его нельзя."""
+        self.archive()
+        url = reverse('posts:post_detail', args=[self.old_post.pk])
+        response = self.authorized_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['post'].is_archived)
+        self.assertContains(response, 'Старый комментарий')
+        self.assertNotContains(
+            response, reverse('posts:add_comment', args=[self.old_post.pk]))
+        response = self.client.get(
+            reverse('posts:post_comments', args=[self.old_post.pk]))
+        self.assertContains(response, 'Старый комментарий')
+        response = self.client.get(
+            reverse('posts:post_detail', args=[10 ** 6]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_deep_pages_continue_with_archive(self):
+        """Дальние страницы лент продолжаются архивными постами."""
+        newest = [post.pk for post in reversed(self.posts)]
+        urls = (
+            (self.client, reverse('posts:index')),
+            (self.client,
+             reverse('posts:posts_group', args=['archive-group'])),
+            (self.client, reverse('posts:profile', args=['Author'])),
+            (self.authorized_client, reverse('posts:follow_index')),
+        )
+        self.archive()
+        for client, url in urls:
+            for page in (1, 2, 3):
+                with self.subTest(url=url, page=page):
+                    self.assertEqual(
+                        self.page_ids(client, url, page),
+                        newest[(page - 1) * 10:page * 10])
+
+    def test_cursor_pages_continue_with_archive(self):
+        """Курсорная пагинация проходит горячие и архивные посты."""
+        self.archive()
+        url = reverse('posts:index')
+        seen = []
+        cursor = ''
+        while True:
+            page = self.client.get(url, {'cursor': cursor}).context['page_obj']
+            seen.extend(post.pk for post in page)
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+        self.assertEqual(seen, [post.pk for post in reversed(self.posts)])
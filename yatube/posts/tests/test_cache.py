@@ -0,0 +1,225 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.decorators import page_key
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class AnonymousPageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='cache-group', description='-')
+        cls.post = Post.objects.create(
+            author=cls.user, group=cls.group, text='Тестовый пост')
+        cls.urls = [
+            reverse('posts:index'),
+            reverse('posts:posts_group', args=[cls.group.slug]),
+            reverse('posts:profile', args=[cls.user.username]),
+            reverse('posts:post_detail', args=[cls.post.pk]),
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_guest_pages_served_from_cache(self):
+        """Повторный гостевой запрос не выполняет запросов к базе."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                with self.assertNumQueries(0):
+                    second = self.client.get(url)
+                self.assertEqual(first.content, second.content)
+
+    def test_session_bypasses_cache(self):
+        """Запросы с сессионной cookie не читают гостевой кеш."""
+        authorized_client = Client()
+        authorized_client.force_login(self.user)
+        self.client.get(self.urls[0])
+        response = authorized_client.get(self.urls[0])
+        self.assertContains(response, reverse('posts:post_create'))
+
+    def test_post_write_purges_pages(self):
+        """Запись поста сбрасывает главную, сообщество, профиль и пост."""
+        for url in self.urls:
+            self.client.get(url)
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Обновлённый текст'
+        post.save()
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), 'Обновлённый текст')
+
+    def test_comment_purges_post_detail(self):
+        """Новый комментарий сбрасывает только страницу поста."""
+        for url in self.urls:
+            self.client.get(url)
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Новый комментарий')
+        response = self.client.get(self.urls[-1])
+        self.assertContains(response, 'Новый комментарий')
+        with self.assertNumQueries(0):
+            self.client.get(self.urls[0])
+
+    def test_non_ascii_profile_purged(self):
+        """Профиль с кириллическим именем сбрасывается записью поста:
+        ключ кеша и сброс используют один вид адреса."""
+        author = User.objects.create_user(username='Вася')
+        url = reverse('posts:profile', args=[author.username])
+        self.client.get(url)
+        Post.objects.create(author=author, text='Пост Васи')
+        self.assertContains(self.client.get(url), 'Пост Васи')
+
+    def test_long_query_cached(self):
+        """Длинная строка запроса не ломает ключ кеша."""
+        url = self.urls[0]
+        query = {'q': 'я' * 300}
+        first = self.client.get(url, query)
+        with self.assertNumQueries(0):
+            second = self.client.get(url, query)
+        self.assertEqual(first.content, second.content)
+
+    @override_settings(ANONYMOUS_CACHE_TIMEOUT=0)
+    def test_stale_page_served_during_revalidation(self):
+        """Пока один запрос пересобирает страницу, остальным
+        отдаётся просроченная копия."""
+        url = self.urls[0]
+        first = self.client.get(url)
+        lock_key = f'{page_key(url)}:lock'
+        cache.add(lock_key, True)
+        with self.assertNumQueries(0):
+            stale = self.client.get(url)
+        self.assertEqual(first.content, stale.content)
+        cache.delete(lock_key)
+        revalidated = self.client.get(url)
+        self.assertIsNotNone(revalidated.context)
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def test_unchanged_pages_not_modified(self):
+        """Неизменившиеся страницы отвечают 304 без запросов к базе."""
+        pages = (
+            (self.client, reverse('posts:index')),
+            (self.client, reverse('posts:post_detail', args=[self.post.pk])),
+            (self.authorized_client, reverse('posts:follow_index')),
+        )
+        for client, url in pages:
+            with self.subTest(url=url):
+                etag = client.get(url)['ETag']
+                with self.assertNumQueries(
+                        0 if client is self.client else 2):
+                    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+    def test_post_detail_last_modified(self):
+        """Страница поста отвечает 304 на If-Modified-Since."""
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        last_modified = self.client.get(url)['Last-Modified']
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_new_comment_changes_etag(self):
+        """Новый комментарий меняет ETag страницы поста."""
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        etag = self.client.get(url)['ETag']
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Новый комментарий')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_new_post_changes_feed_etag(self):
+        """Новый пост и подписка меняют ETag лент."""
+        index = reverse('posts:index')
+        follow = reverse('posts:follow_index')
+        index_etag = self.client.get(index)['ETag']
+        follow_etag = self.authorized_client.get(follow)['ETag']
+        Post.objects.create(author=self.user, text='Новый пост')
+        response = self.client.get(index, HTTP_IF_NONE_MATCH=index_etag)
+        self.assertEqual(response.status_code, 200)
+        follow_etag = self.authorized_client.get(follow)['ETag']
+        Follow.objects.create(user=self.reader, author=self.user)
+        response = self.authorized_client.get(
+            follow, HTTP_IF_NONE_MATCH=follow_etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_profile_and_group_etags(self):
+        """ETag профиля меняется от подписки на автора, ETag сообщества —
+        от поста в нём, но не от постов вне сообщества."""
+        other = User.objects.create_user(username='Other')
+        group = Group.objects.create(
+            title='Группа', slug='etag-group', description='-')
+        profile = reverse('posts:profile', args=[self.user.username])
+        group_url = reverse('posts:posts_group', args=[group.slug])
+        profile_etag = self.client.get(profile)['ETag']
+        Follow.objects.create(user=other, author=self.user)
+        response = self.client.get(profile, HTTP_IF_NONE_MATCH=profile_etag)
+        self.assertContains(response, 'Подписчиков: 1')
+        group_etag = self.client.get(group_url)['ETag']
+        Post.objects.create(author=other, text='Вне сообщества')
+        response = self.client.get(group_url, HTTP_IF_NONE_MATCH=group_etag)
+        self.assertEqual(response.status_code, 304)
+        Post.objects.create(author=other, group=group, text='В сообществе')
+        response = self.client.get(group_url, HTTP_IF_NONE_MATCH=group_etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_deleted_comment_moves_last_modified_forward(self):
+        """Удаление последнего комментария не возвращает Last-Modified
+        назад: If-Modified-Since не получает устаревший 304."""
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        comment = Comment.objects.create(
+            post=self.post, author=self.user, text='Комментарий')
+        Post.objects.filter(pk=self.post.pk).update(
+            updated=comment.created - timedelta(days=1))
+        Comment.objects.filter(pk=comment.pk).update(
+            created=comment.created - timedelta(seconds=10))
+        cache.clear()
+        last_modified = self.client.get(url)['Last-Modified']
+        comment.delete()
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+
+    def test_post_detail_etag_follows_csrf_token(self):
+        """После смены CSRF-cookie вошедший пользователь получает
+        страницу с новым токеном, а не 304."""
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        # Первый ответ выдаёт CSRF-cookie.
+        self.authorized_client.get(url)
+        response = self.authorized_client.get(url)
+        self.assertNotIn('Last-Modified', response)
+        etag = response['ETag']
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.authorized_client.cookies[settings.CSRF_COOKIE_NAME] = 'rotated'
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_post_detail_etag_follows_author_posts(self):
+        """Новый пост автора меняет ETag: страница показывает число его
+        постов."""
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        etag = self.client.get(url)['ETag']
+        Post.objects.create(author=self.user, text='Ещё пост')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,116 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Post, UserStats
+
+User = get_user_model()
+
+
+class CounterTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+
+    def setUp(self):
+        cache.clear()
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def loaddata(self, fixture):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'fixture.json')
+            with open(path, 'w', encoding='utf-8') as stream:
+                json.dump(fixture, stream)
+            call_command('loaddata', path, verbosity=0)
+
+    def test_loaddata_creates_user_stats(self):
+        """Пользователь из фикстуры получает счётчики, которые двигают
+        его загруженные следом посты и подписки."""
+        self.loaddata([
+            {'model': 'auth.user', 'pk': 500,
+             'fields': {'username': 'fixture', 'password': ''}},
+            {'model': 'posts.post', 'pk': 500,
+             'fields': {'text': 'Пост', 'author': 500, 'image': '',
+                        'pub_date': '2011-11-11T20:21:00Z'}},
+            {'model': 'posts.follow', 'pk': 500,
+             'fields': {'user': self.reader.pk, 'author': 500}},
+        ])
+        stats = UserStats.objects.get(user_id=500)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.followers_count, 1)
+
+    def test_posts_count(self):
+        """Создание и удаление поста меняют счётчик автора."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        post.delete()
+        self.assertEqual(self.stats(self.author).posts_count, 0)
+
+    def test_follow_counts(self):
+        """Подписка меняет счётчики подписчиков и подписок."""
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        follow.delete()
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+    def test_comments_count(self):
+        """Комментарии меняют счётчик поста."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='Комментарий')
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+
+    def test_post_save_keeps_comments_count(self):
+        """Правка поста не затирает счётчик, изменившийся после чтения."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        Comment.objects.create(post=post, author=self.reader, text='-')
+        post.text = 'Исправленный пост'
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.text, 'Исправленный пост')
+        self.assertEqual(post.comments_count, 1)
+
+    def test_recount_repairs_drift(self):
+        """Команда recount исправляет разошедшиеся счётчики."""
+        post = Post.objects.create(author=self.author, text='Пост')
+        Comment.objects.create(post=post, author=self.reader, text='-')
+        Follow.objects.create(user=self.reader, author=self.author)
+        UserStats.objects.update(
+            posts_count=7, followers_count=7, following_count=7)
+        Post.objects.update(comments_count=7)
+        UserStats.objects.filter(user=self.reader).delete()
+        out = StringIO()
+        call_command('recount', stdout=out)
+        self.assertIn('Исправлено значений: 5', out.getvalue())
+        author_stats = self.stats(self.author)
+        self.assertEqual(author_stats.posts_count, 1)
+        self.assertEqual(author_stats.followers_count, 1)
+        self.assertEqual(author_stats.following_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+
+    def test_profile_reads_stored_counts(self):
+        """Профиль показывает сохранённые счётчики без агрегатов."""
+        Post.objects.create(author=self.author, text='Пост')
+        UserStats.objects.filter(user=self.author).update(posts_count=42)
+        response = self.client.get(
+            reverse('posts:profile', args=[self.author.username]))
+        self.assertContains(response, 'Всего постов: 42')
@@ -0,0 +1,102 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..dumps import Importer
+from ..models import Comment, Follow, Group, Post, TimelineEntry, UserStats
+
+User = get_user_model()
+
+
+class DumpTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.mkdtemp()
+        cls.path = os.path.join(cls.directory, 'dump.ndjson')
+        author = User.objects.create_user(username='Author')
+        reader = User.objects.create_user(username='Reader')
+        group = Group.objects.create(
+            title='Тестовая группа', slug='dump-group', description='-')
+        for i in range(5):
+            post = Post.objects.create(
+                author=author, group=group if i % 2 else None,
+                text=f'Пост {i}')
+        Comment.objects.create(post=post, author=reader, text='Комментарий')
+        Follow.objects.create(user=reader, author=author)
+        Post.objects.filter(pk=post.pk).update(
+            pub_date='2020-01-01T00:00:00Z')
+        call_command('export_posts', cls.path, stderr=StringIO())
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory, ignore_errors=True)
+        super().tearDownClass()
+
+    def import_dump(self, *args):
+        call_command('import_posts', self.path, *args, stdout=StringIO())
+
+    def snapshot(self):
+        return {
+            'posts': list(Post.objects.order_by('text').values_list(
+                'author__username', 'group__slug', 'text', 'pub_date')),
+            'comments': list(Comment.objects.values_list(
+                'post__text', 'author__username', 'text')),
+            'follows': list(Follow.objects.values_list(
+                'user__username', 'author__username')),
+        }
+
+    def test_round_trip_into_empty_database(self):
+        """Дамп восстанавливается с датами, связями и счётчиками."""
+        expected = self.snapshot()
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        # Новые пользователи занимают старые id: ссылки сопоставляются
+        # по username.
+        User.objects.create_user(username='Someone')
+        self.import_dump()
+        self.assertEqual(self.snapshot(), expected)
+        author = User.objects.get(username='Author')
+        self.assertEqual(author.stats.posts_count, 5)
+        self.assertEqual(author.stats.followers_count, 1)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user__username='Reader').count(), 5)
+
+    def test_resume_after_failure(self):
+        """После сбоя загрузка продолжается без дублей."""
+        expected = self.snapshot()
+        Post.objects.all().delete()
+        flush = Importer.flush
+        calls = []
+
+        def failing_flush(importer, model, rows, offset):
+            if model == 'posts.comment' and not calls:
+                calls.append(model)
+                raise RuntimeError('Сбой загрузки')
+            flush(importer, model, rows, offset)
+
+        with mock.patch.object(Importer, 'flush', failing_flush):
+            with self.assertRaises(RuntimeError):
+                self.import_dump('--batch-size', '2')
+        self.assertTrue(os.path.exists(f'{self.path}.checkpoint'))
+        self.assertEqual(Post.objects.count(), 5)
+        self.import_dump('--batch-size', '2')
+        self.assertEqual(self.snapshot(), expected)
+        self.assertFalse(os.path.exists(f'{self.path}.checkpoint'))
+        self.assertEqual(UserStats.objects.get(
+            user__username='Author').posts_count, 5)
+
+    def test_empty_dump(self):
+        """Пустой дамп загружается без контрольной точки."""
+        path = os.path.join(self.directory, 'empty.ndjson')
+        open(path, 'wb').close()
+        stdout = StringIO()
+        call_command('import_posts', path, stdout=stdout)
+        self.assertIn('Загружено 0', stdout.getvalue())
+        self.assertFalse(os.path.exists(f'{path}.checkpoint'))
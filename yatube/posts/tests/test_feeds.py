@@ -0,0 +1,174 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..feeds import backfill_timeline
+from ..models import Follow, Group, Post, TimelineEntry
+from ..utils import feed_count_key
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.author = User.objects.create_user(username='Author')
+        cls.other = User.objects.create_user(username='Other')
+        cls.old_post = Post.objects.create(
+            author=cls.author, text='Пост до подписки')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def feed(self):
+        response = self.client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_follow_backfills_timeline(self):
+        """Подписка добавляет в ленту старые посты автора."""
+        self.client.get(
+            reverse('posts:profile_follow', args=[self.author.username]))
+        self.assertEqual(self.feed(), [self.old_post])
+
+    @override_settings(TASKS_ALWAYS_EAGER=False)
+    def test_backfill_resets_cached_count(self):
+        """Число постов, закешированное до фоновой раскладки,
+        сбрасывается после неё."""
+        self.client.get(
+            reverse('posts:profile_follow', args=[self.author.username]))
+        count_key = feed_count_key('follower', self.reader.pk)
+        cache.set(count_key, 0)
+        backfill_timeline(self.reader.pk, self.author.pk)
+        self.assertIsNone(cache.get(count_key))
+
+    def test_new_post_fans_out(self):
+        """Новый пост попадает в ленты подписчиков автора."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(author=self.author, text='Новый пост')
+        Post.objects.create(author=self.other, text='Чужой пост')
+        self.assertEqual(self.feed(), [new_post, self.old_post])
+
+    def test_unfollow_prunes_timeline(self):
+        """Отписка убирает посты автора из ленты."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.client.get(
+            reverse('posts:profile_unfollow', args=[self.author.username]))
+        self.assertEqual(self.feed(), [])
+        self.assertFalse(TimelineEntry.objects.filter(user=self.reader))
+
+    @override_settings(FEED_FANOUT_MAX_FOLLOWERS=0)
+    def test_prolific_author_read_fallback(self):
+        """Посты авторов сверх лимита подмешиваются при чтении."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertFalse(
+            TimelineEntry.objects.filter(post=new_post).exists())
+        self.assertEqual(self.feed(), [new_post, self.old_post])
+
+
+class RecentPostsMergeTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.authors = [
+            User.objects.create_user(username=f'Author{i}') for i in range(3)
+        ]
+        for author in cls.authors:
+            Follow.objects.create(user=cls.reader, author=author)
+        cls.posts = [
+            Post.objects.create(
+                author=cls.authors[i % 3], text=f'Пост {i}')
+            for i in range(25)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def page(self, number):
+        response = self.client.get(
+            reverse('posts:follow_index'), {'page': number})
+        return [post.pk for post in response.context['page_obj']]
+
+    def expected(self, number):
+        newest = [post.pk for post in reversed(self.posts)]
+        return newest[(number - 1) * 10:number * 10]
+
+    def test_merged_pages_match_feed(self):
+        """Слияние списков авторов даёт те же страницы, что и лента."""
+        for number in (1, 2, 3):
+            with self.subTest(number=number):
+                self.assertEqual(self.page(number), self.expected(number))
+
+    def test_merged_page_skips_feed_join(self):
+        """Первая страница не обращается к материализованной ленте."""
+        self.page(1)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.page(1), self.expected(1))
+        self.assertFalse(any(
+            'posts_timelineentry' in query['sql'] for query in queries))
+
+    @override_settings(FEED_RING_SIZE=10)
+    def test_deep_page_falls_back_to_timeline(self):
+        """Страницы глубже кешированных списков читаются из ленты."""
+        self.assertEqual(self.page(2), self.expected(2))
+
+    def test_lists_follow_writes(self):
+        """Списки авторов обновляются при создании и удалении постов."""
+        self.page(1)
+        new_post = Post.objects.create(author=self.authors[0], text='Новый')
+        self.assertEqual(self.page(1)[0], new_post.pk)
+        new_post.delete()
+        self.assertEqual(self.page(1), self.expected(1))
+
+
+class FeedQueryCountTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='feed-group', description='Описание')
+        cls.author = User.objects.create_user(username='Author')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def add_posts(self, start, stop):
+        for i in range(start, stop):
+            author = User.objects.create_user(username=f'Extra{i}')
+            group = Group.objects.create(
+                title=f'Группа {i}', slug=f'extra-{i}', description='-')
+            Follow.objects.create(user=self.reader, author=author)
+            Post.objects.create(author=author, group=group, text='Пост')
+            Post.objects.create(
+                author=self.author, group=self.group, text='Пост')
+
+    def test_list_views_query_count(self):
+        """Число запросов ленты с прогретым кешем не зависит
+        от числа постов, авторов и сообществ на странице."""
+        urls = {
+            reverse('posts:index'): 2,
+            reverse('posts:posts_group', args=[self.group.slug]): 4,
+            reverse('posts:profile', args=[self.author.username]): 5,
+            reverse('posts:follow_index'): 4,
+        }
+        for start, stop in ((0, 1), (1, 6)):
+            self.add_posts(start, stop)
+            for url, queries in urls.items():
+                with self.subTest(url=url, posts=stop):
+                    self.client.get(url)
+                    with self.assertNumQueries(queries):
+                        self.client.get(url)
@@ -0,0 +1,97 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Follow, Post, TimelineEntry, UserStats
+
+User = get_user_model()
+
+
+class BulkFollowTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.authors = [
+            User.objects.create_user(username=f'Author{i}') for i in range(3)
+        ]
+        for author in cls.authors:
+            Post.objects.create(author=author, text=f'Пост {author}')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def bulk(self, action, usernames):
+        return self.client.post(reverse('posts:follow_bulk'), {
+            'action': action, 'usernames': usernames}).json()
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_bulk_follow(self):
+        """Пакетная подписка создаёт подписки, счётчики и ленту."""
+        Follow.objects.create(user=self.reader, author=self.authors[0])
+        response = self.bulk(
+            'follow', 'Author0, Author1 Author2 Reader Nobody')
+        self.assertEqual(response['changed'], ['Author1', 'Author2'])
+        self.assertEqual(response['skipped'], ['Reader'])
+        self.assertEqual(response['unknown'], ['Nobody'])
+        self.assertEqual(Follow.objects.filter(user=self.reader).count(), 3)
+        self.assertEqual(self.stats(self.reader).following_count, 3)
+        for author in self.authors:
+            self.assertEqual(self.stats(author).followers_count, 1)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 3)
+        feed = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(feed.context['page_obj'].paginator.count, 3)
+
+    def test_bulk_unfollow(self):
+        """Пакетная отписка удаляет подписки и записи ленты."""
+        self.bulk('follow', 'Author0 Author1 Author2')
+        self.client.get(reverse('posts:follow_index'))
+        with self.assertNumQueries(12):
+            response = self.bulk('unfollow', 'Author0 Author1')
+        self.assertEqual(response['changed'], ['Author0', 'Author1'])
+        self.assertEqual(
+            list(Follow.objects.filter(user=self.reader).values_list(
+                'author__username', flat=True)),
+            ['Author2'])
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        self.assertEqual(self.stats(self.authors[0]).followers_count, 0)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 1)
+        feed = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(feed.context['page_obj'].paginator.count, 1)
+
+    def test_bulk_unfollow_applied_once(self):
+        """Сигналы при пакетной отписке заглушены: счётчики сдвигаются
+        один раз."""
+        other = User.objects.create_user(username='Other')
+        for follower in (self.reader, other):
+            Follow.objects.create(user=follower, author=self.authors[0])
+        self.bulk('unfollow', 'Author0')
+        self.assertEqual(self.stats(self.authors[0]).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+    @override_settings(FOLLOW_BULK_MAX=2)
+    def test_bulk_rejects_bad_requests(self):
+        """Слишком длинный список и GET-запрос отклоняются."""
+        response = self.client.post(reverse('posts:follow_bulk'), {
+            'action': 'follow', 'usernames': 'Author0 Author1 Author2'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse('posts:follow_bulk'))
+        self.assertEqual(response.status_code, 405)
+
+    def test_follow_state_single_query(self):
+        """Состояние подписок на список авторов — один запрос к постам."""
+        Follow.objects.create(user=self.reader, author=self.authors[1])
+        url = reverse('posts:follow_state')
+        self.client.get(url, {'usernames': 'Author0'})
+        with self.assertNumQueries(3):
+            response = self.client.get(
+                url, {'usernames': 'Author0,Author1,Author2,Nobody'})
+        self.assertEqual(response.json(), {
+            'Author0': False, 'Author1': True, 'Author2': False})
@@ -0,0 +1,99 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..graph import FollowGraph, load_graph, refresh_graph
+from ..models import Follow, FollowSuggestion
+
+User = get_user_model()
+
+
+class FollowGraphTests(TestCase):
+    edges = [(1, 2), (1, 3), (2, 3), (2, 4), (3, 4), (3, 5), (5, 1)]
+
+    def test_rows_match_edges(self):
+        """Строки графа содержат подписки пользователей по возрастанию."""
+        graph = FollowGraph.from_edges(self.edges)
+        self.assertEqual(list(graph.following(1)), [2, 3])
+        self.assertEqual(list(graph.following(4)), [])
+        self.assertEqual(list(graph.following(100)), [])
+        self.assertTrue(graph.follows(3, 5))
+        self.assertFalse(graph.follows(3, 1))
+        self.assertEqual(graph.edges, len(self.edges))
+
+    def test_with_rows_matches_full_build(self):
+        """Замена строк даёт тот же граф, что и сборка с нуля."""
+        graph = FollowGraph.from_edges(self.edges)
+        rows = {2: [1], 4: [5, 2], 7: [1]}
+        edges = sorted(
+            [edge for edge in self.edges if edge[0] not in rows]
+            + [(user, author) for user, authors in rows.items()
+               for author in authors])
+        expected = FollowGraph.from_edges(edges)
+        updated = graph.with_rows(rows)
+        self.assertEqual(updated.offsets, expected.offsets)
+        self.assertEqual(updated.targets, expected.targets)
+
+    def test_suggest_friends_of_friends(self):
+        """Рекомендации — авторы из подписок авторов пользователя,
+        кроме него самого и тех, на кого он уже подписан."""
+        graph = FollowGraph.from_edges(self.edges)
+        self.assertEqual(graph.suggest(1, 10, 100), [(4, 2), (5, 1)])
+        self.assertEqual(graph.suggest(1, 1, 100), [(4, 2)])
+        self.assertEqual(graph.suggest(1, 10, 1), [])
+
+
+class SuggestionTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader, cls.friend, cls.author, cls.other = [
+            User.objects.create_user(username=name)
+            for name in ('Reader', 'Friend', 'Author', 'Other')
+        ]
+        Follow.objects.create(user=cls.reader, author=cls.friend)
+        Follow.objects.create(user=cls.friend, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_command_stores_suggestions(self):
+        """Команда сохраняет рекомендации, страницы их показывают."""
+        call_command('compute_suggestions', stdout=StringIO())
+        suggestion = FollowSuggestion.objects.get(user=self.reader)
+        self.assertEqual(
+            (suggestion.author, suggestion.score), (self.author, 1))
+        for url in (
+            reverse('posts:follow_index'),
+            reverse('posts:profile', args=[self.other.username]),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.context['suggestions'], ['Author'])
+
+    def test_follow_drops_suggestion(self):
+        """Подписка убирает автора из рекомендаций."""
+        call_command('compute_suggestions', stdout=StringIO())
+        self.client.get(reverse('posts:follow_index'))
+        self.client.get(
+            reverse('posts:profile_follow', args=[self.author.username]))
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['suggestions'], [])
+
+    def test_refresh_catches_up_with_writes(self):
+        """Догоняющее обновление видит новые подписки и отписки."""
+        graph, last_pk = load_graph()
+        Follow.objects.create(user=self.friend, author=self.other)
+        Follow.objects.filter(user=self.reader).delete()
+        graph, last_pk, changed = refresh_graph(graph, last_pk)
+        self.assertEqual(changed, {self.reader.pk, self.friend.pk})
+        self.assertEqual(list(graph.following(self.reader.pk)), [])
+        self.assertEqual(
+            list(graph.following(self.friend.pk)),
+            sorted([self.author.pk, self.other.pk]))
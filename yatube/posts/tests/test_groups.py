@@ -0,0 +1,156 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Group, GroupStats, Post
+
+User = get_user_model()
+
+
+class GroupStatsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.group = Group.objects.create(
+            title='Первая группа', slug='first', description='-')
+        cls.other_group = Group.objects.create(
+            title='Вторая группа', slug='second', description='-')
+
+    def setUp(self):
+        cache.clear()
+
+    def stats(self, group):
+        return GroupStats.objects.get(group=group)
+
+    def test_stats_follow_posts(self):
+        """Счётчик и превью сообщества меняются при записи постов."""
+        first = Post.objects.create(
+            author=self.author, group=self.group, text='Первый пост')
+        last = Post.objects.create(
+            author=self.author, group=self.group, text='Последний пост')
+        stats = self.stats(self.group)
+        self.assertEqual(stats.posts_count, 2)
+        self.assertEqual(stats.last_post_id, last.pk)
+        self.assertEqual(stats.last_post_text, 'Последний пост')
+        last.text = 'Исправленный пост'
+        last.save()
+        self.assertEqual(
+            self.stats(self.group).last_post_text, 'Исправленный пост')
+        last.group = self.other_group
+        last.save()
+        stats = self.stats(self.group)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.last_post_id, first.pk)
+        self.assertEqual(self.stats(self.other_group).last_post_id, last.pk)
+        first.delete()
+        stats = self.stats(self.group)
+        self.assertEqual(stats.posts_count, 0)
+        self.assertIsNone(stats.last_post_id)
+        self.assertEqual(stats.last_post_text, '')
+
+    def test_loaddata_creates_group_stats(self):
+        """Сообщество из фикстуры получает счётчик и превью постов,
+        загруженных следом."""
+        fixture = [
+            {'model': 'posts.group', 'pk': 500,
+             'fields': {'title': 'Из фикстуры', 'slug': 'fixture',
+                        'description': '-'}},
+            {'model': 'posts.post', 'pk': 500,
+             'fields': {'text': 'Пост из фикстуры', 'author': self.author.pk,
+                        'group': 500, 'image': '',
+                        'pub_date': '2011-11-11T20:21:00Z'}},
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'fixture.json')
+            with open(path, 'w', encoding='utf-8') as stream:
+                json.dump(fixture, stream)
+            call_command('loaddata', path, verbosity=0)
+        stats = GroupStats.objects.get(group_id=500)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.last_post_text, 'Пост из фикстуры')
+
+    def test_recount_repairs_group_stats(self):
+        """Команда recount восстанавливает счётчики сообществ."""
+        post = Post.objects.create(
+            author=self.author, group=self.group, text='Пост')
+        GroupStats.objects.filter(group=self.other_group).delete()
+        GroupStats.objects.filter(group=self.group).update(
+            posts_count=5, last_post_id=None, last_post_text='')
+        call_command('recount', stdout=StringIO())
+        stats = self.stats(self.group)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.last_post_id, post.pk)
+        self.assertEqual(stats.last_post_text, 'Пост')
+        self.assertEqual(self.stats(self.other_group).posts_count, 0)
+
+
+@override_settings(GROUPS_PER_PAGE=5)
+class GroupIndexTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.group = Group.objects.create(
+            title='Группа 00', slug='group-00', description='-')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Свежий пост группы')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.author)
+
+    def add_groups(self, start, stop):
+        for i in range(start, stop):
+            Group.objects.create(
+                title=f'Группа {i:02}', slug=f'group-{i:02}', description='-')
+
+    def test_directory_shows_stats(self):
+        """Каталог показывает число постов и превью последнего поста."""
+        response = self.client.get(reverse('posts:group_index'))
+        self.assertContains(response, 'Постов: 1')
+        self.assertContains(response, 'Свежий пост группы')
+        self.assertContains(
+            response, reverse('posts:post_detail', args=[self.post.pk]))
+
+    def test_directory_query_count(self):
+        """Число запросов страницы каталога не зависит от числа сообществ."""
+        url = reverse('posts:group_index')
+        for start, stop in ((1, 2), (2, 30)):
+            self.add_groups(start, stop)
+            with self.subTest(groups=stop):
+                with CaptureQueriesContext(connection) as queries:
+                    self.authorized_client.get(url)
+                self.assertEqual(len(queries), 3)
+
+    def test_cursor_pages_cover_all_groups(self):
+        """Курсоры каталога проходят все сообщества по названию."""
+        self.add_groups(1, 12)
+        url = reverse('posts:group_index')
+        seen = []
+        cursor = ''
+        while True:
+            page = self.client.get(url, {'cursor': cursor}).context['page_obj']
+            seen.extend(group.slug for group in page)
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+        self.assertEqual(seen, [f'group-{i:02}' for i in range(12)])
+
+    def test_new_post_purges_directory(self):
+        """Новый пост в сообществе сбрасывает закешированный каталог."""
+        url = reverse('posts:group_index')
+        self.client.get(url)
+        Post.objects.create(
+            author=self.author, group=self.group, text='Новейший пост')
+        self.assertContains(self.client.get(url), 'Новейший пост')
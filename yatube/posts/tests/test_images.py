@@ -0,0 +1,106 @@
+import io
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from PIL import Image
+
+from ..forms import PostForm
+from ..images import process_image
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_upload(name, size, format, mode='RGB', **params):
+    buffer = io.BytesIO()
+    Image.new(mode, size, 'steelblue').save(buffer, format, **params)
+    return SimpleUploadedFile(
+        name, buffer.getvalue(), f'image/{format.lower()}')
+
+
+@override_settings(IMAGE_MAX_SIDE=64, IMAGE_MAX_PIXELS=200 * 200)
+class ProcessImageTests(SimpleTestCase):
+    def test_jpeg_downsampled_without_metadata(self):
+        """Большой JPEG уменьшается ещё при декодировании, метаданные
+        отбрасываются."""
+        exif = Image.Exif()
+        exif[0x0110] = 'Camera'  # Model
+        upload = make_upload(
+            'photo.jpeg', (1000, 500), 'JPEG', exif=exif.tobytes())
+        processed = process_image(upload)
+        self.assertEqual(processed.name, 'photo.jpg')
+        with Image.open(processed.temporary_file_path()) as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(image.size, (64, 32))
+            self.assertNotIn('exif', image.info)
+
+    def test_exif_orientation_applied(self):
+        """Поворот из EXIF применяется до того, как EXIF отброшен."""
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: повернуть на 90°
+        upload = make_upload(
+            'rotated.jpg', (60, 30), 'JPEG', exif=exif.tobytes())
+        with Image.open(process_image(upload)) as image:
+            self.assertEqual(image.size, (30, 60))
+
+    def test_transparent_png_kept(self):
+        """Картинка с прозрачностью остаётся PNG без метаданных."""
+        upload = make_upload(
+            'logo.png', (40, 40), 'PNG', mode='RGBA',
+            icc_profile=b'profile', dpi=(300, 300))
+        processed = process_image(upload)
+        self.assertEqual(processed.name, 'logo.png')
+        with Image.open(processed) as image:
+            self.assertEqual(image.mode, 'RGBA')
+            self.assertEqual(image.info, {})
+
+    def test_too_many_pixels_rejected(self):
+        """Не-JPEG больше бюджета пикселей отклоняется без декодирования."""
+        upload = make_upload('huge.png', (300, 300), 'PNG')
+        with self.assertRaises(ValidationError) as error:
+            process_image(upload)
+        self.assertEqual(error.exception.code, 'too_many_pixels')
+
+    def test_truncated_upload_rejected(self):
+        """Обрезанный файл отклоняется ошибкой валидации, а не падением."""
+        upload = make_upload('cut.jpg', (60, 60), 'JPEG')
+        upload = SimpleUploadedFile(
+            upload.name, upload.read()[:200], upload.content_type)
+        with self.assertRaises(ValidationError) as error:
+            process_image(upload)
+        self.assertEqual(error.exception.code, 'invalid_image')
+
+    @override_settings(IMAGE_UPLOAD_MAX_SIZE=10)
+    def test_post_form_rejects_large_file(self):
+        """Форма поста не принимает файл больше IMAGE_UPLOAD_MAX_SIZE."""
+        form = PostForm(
+            {'text': 'Пост'},
+            {'image': make_upload('big.png', (10, 10), 'PNG')},
+        )
+        self.assertFalse(form.is_valid())
+        self.assertIn('image', form.errors)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class PostFormImageTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_processed_file_closed_after_save(self):
+        """После сохранения поста обработанный временный файл закрыт."""
+        form = PostForm(
+            {'text': 'Пост'},
+            {'image': make_upload('photo.png', (10, 10), 'PNG')},
+        )
+        self.assertTrue(form.is_valid())
+        form.instance.author = User.objects.create_user(username='Author')
+        post = form.save()
+        self.assertTrue(post.image)
+        self.assertTrue(form.cleaned_data['image'].file.closed)
@@ -0,0 +1,58 @@
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection
+from django.test import TestCase
+
+from ..models import Follow, Group, Post
+
+User = get_user_model()
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN есть в SQLite')
+class FeedIndexTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='index-group', description='-')
+        cls.post = Post.objects.create(
+            author=cls.user, group=cls.group, text='Пост')
+
+    def query_plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return ' '.join(row[-1] for row in cursor.fetchall())
+
+    def test_feed_queries_use_indexes(self):
+        """Ленты автора, сообщества и комментарии поста читаются
+        по составному индексу без сортировки во временном B-дереве."""
+        queries = {
+            'post_author_date_idx': self.user.posts.all(),
+            'post_group_date_idx': self.group.posts.all(),
+            'comment_post_created_idx': self.post.comments.all(),
+        }
+        for index, queryset in queries.items():
+            with self.subTest(index=index):
+                plan = self.query_plan(queryset[:10])
+                self.assertIn(index, plan)
+                self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_follow_lookup_uses_unique_index(self):
+        """Проверка подписки идёт по уникальному индексу (user, author)."""
+        plan = self.query_plan(
+            Follow.objects.filter(user=self.user, author=self.user))
+        # SQLite хранит ограничение таблицы как sqlite_autoindex.
+        self.assertIn('(user_id=? AND author_id=?)', plan)
+
+
+class FollowUniqueTests(TestCase):
+    def test_duplicate_follow_rejected(self):
+        """Повторная подписка на того же автора не создаётся."""
+        user = User.objects.create_user(username='Reader')
+        author = User.objects.create_user(username='Author')
+        Follow.objects.create(user=user, author=author)
+        with self.assertRaises(IntegrityError):
+            Follow.objects.create(user=user, author=author)
@@ -1,4 +1,9 @@
+import json
+import os
+import tempfile
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
 
 from ..models import Group, Post
@@ -72,3 +77,23 @@ class PostModelTest(TestCase):
             with self.subTest(field=field):
                 self.assertEqual(
                     post._meta.get_field(field).help_text, expected_value)
+
+
+class FixtureLoadTests(TestCase):
+    def test_loaddata_without_updated(self):
+        """Фикстура без поля updated загружается: оно берётся из
+        pub_date."""
+        fixture = [
+            {'model': 'auth.user', 'pk': 500,
+             'fields': {'username': 'fixture', 'password': ''}},
+            {'model': 'posts.post', 'pk': 500,
+             'fields': {'text': 'Пост из фикстуры', 'author': 500,
+                        'pub_date': '2011-11-11T20:21:00Z', 'image': ''}},
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'fixture.json')
+            with open(path, 'w', encoding='utf-8') as stream:
+                json.dump(fixture, stream)
+            call_command('loaddata', path, verbosity=0)
+        post = Post.objects.get(pk=500)
+        self.assertEqual(post.updated, post.pub_date)
@@ -1,10 +1,14 @@
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
-from django.test import Client, TestCase
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from ..models import Group, Post
+from ..feeds import fan_out_post
+from ..models import Follow, Group, Post
+from ..utils import feed_count_key
 
 User = get_user_model()
 
@@ -63,3 +67,123 @@ class PaginatorViewsTest(TestCase):
                     len(response.context['page_obj']),
                     cnt_pages % settings.NUMPOSTS
                 )
+
+    def test_cursor_pages_cover_feed(self):
+        """Курсорная пагинация обходит всю ленту без повторов
+        и без запроса COUNT(*)."""
+        for reverse_name in self.urls:
+            with self.subTest(reverse_name=reverse_name):
+                seen = []
+                cursor = ''
+                while cursor is not None:
+                    response = self.authorized_client.get(
+                        reverse_name, {'cursor': cursor})
+                    page_obj = response.context['page_obj']
+                    self.assertLessEqual(len(page_obj), settings.NUMPOSTS)
+                    seen.extend(post.pk for post in page_obj)
+                    cursor = page_obj.next_cursor
+                expected = [post.pk for post in reversed(self.posts)]
+                self.assertEqual(seen, expected)
+
+    def test_cursor_previous_page(self):
+        """Ссылка «Предыдущая» возвращает на предыдущую страницу."""
+        url = reverse('posts:index')
+        first = self.authorized_client.get(url, {'cursor': ''})
+        first_page = first.context['page_obj']
+        self.assertFalse(first_page.has_previous())
+        second = self.authorized_client.get(
+            url, {'cursor': first_page.next_cursor})
+        second_page = second.context['page_obj']
+        back = self.authorized_client.get(
+            url, {'cursor': second_page.previous_cursor})
+        self.assertEqual(
+            [post.pk for post in back.context['page_obj']],
+            [post.pk for post in first_page],
+        )
+
+    def test_cursor_invalid_returns_first_page(self):
+        """Битый курсор отдаёт первую страницу."""
+        response = self.authorized_client.get(
+            reverse('posts:index'), {'cursor': 'not-a-cursor'})
+        page_obj = response.context['page_obj']
+        self.assertEqual(len(page_obj), settings.NUMPOSTS)
+        self.assertEqual(page_obj[0].pk, self.posts[-1].pk)
+
+
+class CachedCountTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовое название группы',
+            slug='count-slug',
+            description='Тестовое описание'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Post.objects.bulk_create(
+            Post(author=cls.author, text=f'Пост {i}', group=cls.group)
+            for i in range(3)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def test_count_query_runs_once(self):
+        """COUNT(*) ленты выполняется только при промахе кеша."""
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:posts_group', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:follow_index'),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.client.get(url)
+                with CaptureQueriesContext(connection) as queries:
+                    self.client.get(url)
+                self.assertFalse(any(
+                    'COUNT(' in query['sql'] and 'posts_post' in query['sql']
+                    for query in queries))
+
+    @override_settings(TASKS_ALWAYS_EAGER=False)
+    def test_follower_counts_reset_off_request(self):
+        """Запись поста не трогает счётчики лент подписчиков —
+        их сбрасывает фоновая раскладка."""
+        follower_key = feed_count_key('follower', self.reader.pk)
+        cache.set(follower_key, 3)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertEqual(cache.get(follower_key), 3)
+        fan_out_post(post.pk)
+        self.assertIsNone(cache.get(follower_key))
+
+    def test_counts_follow_writes(self):
+        """Счётчики лент обновляются при создании и удалении постов,
+        ленты подписчиков сбрасывает фоновая задача."""
+        keys = [
+            feed_count_key('all'),
+            feed_count_key('group', self.group.pk),
+            feed_count_key('author', self.author.pk),
+        ]
+        follower_key = feed_count_key('follower', self.reader.pk)
+        for key in keys + [follower_key]:
+            cache.set(key, 3)
+        post = Post.objects.create(
+            author=self.author, text='Новый пост', group=self.group)
+        self.assertEqual(list(cache.get_many(keys).values()), [4] * 3)
+        self.assertIsNone(cache.get(follower_key))
+        post.group = None
+        post.save()
+        self.assertEqual(cache.get(feed_count_key('group', self.group.pk)), 3)
+        cache.set(follower_key, 4)
+        post.delete()
+        self.assertEqual(cache.get(feed_count_key('all')), 3)
+        self.assertEqual(
+            cache.get(feed_count_key('author', self.author.pk)), 3)
+        self.assertIsNone(cache.get(follower_key))
+        cache.set(follower_key, 3)
+        Follow.objects.filter(user=self.reader).delete()
+        self.assertIsNone(
+            cache.get(feed_count_key('follower', self.reader.pk)))
@@ -0,0 +1,79 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.other = User.objects.create_user(username='Other')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='search-group', description='-')
+        cls.best = Post.objects.create(
+            author=cls.author, group=cls.group,
+            text='Котики, котики и ещё раз котики')
+        cls.weak = Post.objects.create(
+            author=cls.other,
+            text='Длинный пост про погоду, огород, рыбалку и котики')
+        cls.unrelated = Post.objects.create(
+            author=cls.author, text='Пост про собак')
+
+    def search(self, **params):
+        response = self.client.get(reverse('posts:search'), params)
+        return list(response.context['page_obj'])
+
+    def test_ranked_results(self):
+        """Результаты упорядочены по релевантности, лишние не попадают."""
+        self.assertEqual(self.search(q='котики'), [self.best, self.weak])
+
+    def test_filters(self):
+        """Поиск фильтруется по сообществу и автору."""
+        self.assertEqual(
+            self.search(q='котики', group=self.group.slug), [self.best])
+        self.assertEqual(
+            self.search(q='котики', author=self.other.username), [self.weak])
+
+    @override_settings(NUMPOSTS=1)
+    def test_cursor_pagination(self):
+        """Курсор ведёт на следующую страницу результатов."""
+        url = reverse('posts:search')
+        first = self.client.get(url, {'q': 'котики'})
+        self.assertEqual(list(first.context['page_obj']), [self.best])
+        second = self.client.get(url, {
+            'q': 'котики', 'cursor': first.context['page_obj'].next_cursor})
+        self.assertEqual(list(second.context['page_obj']), [self.weak])
+        self.assertFalse(second.context['page_obj'].has_next())
+
+    def test_index_follows_writes(self):
+        """Изменение и удаление поста обновляют индекс."""
+        post = Post.objects.get(pk=self.unrelated.pk)
+        post.text = 'Теперь про котиков'
+        post.save()
+        self.assertIn(post, self.search(q='котиков'))
+        post.delete()
+        self.assertNotIn(post, self.search(q='котиков'))
+
+    def test_query_syntax_is_escaped(self):
+        """Операторы FTS5 во вводе не ломают поиск."""
+        for query in ('"котики', 'котики OR', 'NEAR(', '*', 'a:b'):
+            with self.subTest(query=query):
+                response = self.client.get(
+                    reverse('posts:search'), {'q': query})
+                self.assertEqual(response.status_code, 200)
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке идёт по полнотекстовому индексу."""
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+        client = Client()
+        client.force_login(admin)
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'котики'})
+        self.assertEqual(
+            set(response.context['cl'].result_list), {self.best, self.weak})
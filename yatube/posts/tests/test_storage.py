@@ -0,0 +1,118 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.kvstore import KVStore
+
+from ..archive import archive_old_posts
+from ..counters import recount
+from ..models import Post, StoredImage, post_images
+from ..thumbnails import ready_thumbnail
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedStorageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        KVStore.local.clear()
+
+    def create_post(self, name):
+        return Post.objects.create(
+            author=self.user,
+            text='Мем',
+            image=SimpleUploadedFile(name, SMALL_GIF, 'image/gif'),
+        )
+
+    def refs(self, name):
+        return StoredImage.objects.get(name=name).refs
+
+    def test_duplicates_stored_once(self):
+        """Одинаковые загрузки получают одно имя по содержимому
+        и общие миниатюры."""
+        first = self.create_post('meme.gif')
+        second = self.create_post('meme-copy.GIF')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(first.image.name, r'^posts/[0-9a-f]{2}/[0-9a-f]{64}'
+                                           r'\.gif$')
+        self.assertEqual(
+            len(os.listdir(os.path.dirname(first.image.path))), 1)
+        self.assertEqual(self.refs(first.image.name), 2)
+        self.assertEqual(
+            ready_thumbnail(first.image, 'card').name,
+            ready_thumbnail(second.image, 'card').name)
+
+    def test_file_deleted_with_last_reference(self):
+        """Файл и миниатюры удаляются, только когда пропала последняя
+        ссылка на них."""
+        first = self.create_post('meme.gif')
+        second = self.create_post('meme.gif')
+        name = first.image.name
+        thumbnail = ready_thumbnail(first.image, 'card').name
+        first.delete()
+        self.assertTrue(post_images.exists(name))
+        self.assertEqual(self.refs(name), 1)
+        second.delete()
+        self.assertFalse(post_images.exists(name))
+        self.assertFalse(post_images.exists(thumbnail))
+        self.assertFalse(StoredImage.objects.filter(name=name).exists())
+
+    def test_replaced_image_released(self):
+        """Замена картинки поста снимает ссылку со старого файла."""
+        post = self.create_post('meme.gif')
+        old_name = post.image.name
+        post.image = SimpleUploadedFile('other.gif', SMALL_GIF + b'\0')
+        post.save()
+        self.assertNotEqual(post.image.name, old_name)
+        self.assertFalse(post_images.exists(old_name))
+        self.assertEqual(self.refs(post.image.name), 1)
+
+    def test_recount_repairs_refs(self):
+        """Пересчёт восстанавливает потерянные записи о файлах."""
+        post = self.create_post('meme.gif')
+        self.create_post('meme.gif')
+        StoredImage.objects.all().delete()
+        self.assertEqual(recount(), 1)
+        self.assertEqual(self.refs(post.image.name), 2)
+
+    def test_archived_post_releases_image(self):
+        """Удаление автора архивного поста снимает ссылку и удаляет файл."""
+        author = User.objects.create_user(username='Archived')
+        post = Post.objects.create(
+            author=author,
+            text='Старый мем',
+            image=SimpleUploadedFile('old.gif', SMALL_GIF, 'image/gif'),
+        )
+        name = post.image.name
+        archive_old_posts(timezone.now(), 10)
+        self.assertEqual(self.refs(name), 1)
+        author.delete()
+        self.assertFalse(StoredImage.objects.filter(name=name).exists())
+        self.assertFalse(post_images.exists(name))
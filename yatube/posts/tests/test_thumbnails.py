@@ -0,0 +1,137 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from sorl.thumbnail import get_thumbnail
+
+from core.kvstore import KVStore
+
+from ..models import Post
+from ..thumbnails import (generate_thumbnails, ready_picture, ready_thumbnail,
+                          variant)
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        KVStore.local.clear()
+
+    def create_post(self, name):
+        return Post.objects.create(
+            author=self.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(name, SMALL_GIF, 'image/gif'),
+        )
+
+    def test_thumbnails_generated_on_save(self):
+        """Сохранение поста с картинкой строит миниатюры пресетов."""
+        post = self.create_post('saved.gif')
+        thumbnail = ready_thumbnail(post.image, 'card')
+        self.assertIsNotNone(thumbnail)
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, thumbnail.url)
+
+    def test_picture_variants(self):
+        """Лента получает <picture> с WebP-вариантами и srcset JPEG."""
+        post = self.create_post('picture.gif')
+        picture = ready_picture(post.image, 'card')
+        self.assertEqual(
+            [source_type for source_type, _ in picture.sources],
+            ['image/webp'])
+        self.assertEqual(picture.srcset.count('w,'), 2)
+        self.assertTrue(picture.img.name.endswith('.jpg'))
+        self.assertEqual(picture.img.width, 960)
+        for width in (320, 640):
+            webp = ready_thumbnail(post.image, 'card', width, 'WEBP')
+            self.assertEqual(webp.x, width)
+            self.assertTrue(webp.name.endswith('.webp'))
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(
+            response,
+            f'<source type="image/webp" srcset="{picture.sources[0][1]}"')
+        self.assertContains(response, f'srcset="{picture.srcset}"')
+
+    def test_detail_variants_not_upscaled(self):
+        """Страница поста берёт некадрированный пресет; маленький
+        оригинал не растягивается и попадает в srcset один раз."""
+        post = self.create_post('detail.gif')
+        picture = ready_picture(post.image, 'full')
+        self.assertEqual((picture.img.width, picture.img.height), (2, 1))
+        self.assertEqual(picture.srcset, f'{picture.img.url} 2w')
+        response = self.client.get(
+            reverse('posts:post_detail', args=[post.pk]))
+        self.assertContains(response, f'srcset="{picture.srcset}"')
+
+    @override_settings(TASKS_ALWAYS_EAGER=False)
+    def test_render_does_not_generate(self):
+        """Пока миниатюры нет, страница показывает заглушку
+        и не строит миниатюру сама."""
+        post = self.create_post('pending.gif')
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'aspect-ratio: 960 / 339')
+        self.assertNotContains(response, 'card-img my-2" src=')
+        self.assertIsNone(ready_thumbnail(post.image, 'card'))
+        self.assertIsNone(ready_picture(post.image, 'card'))
+
+    @override_settings(TASKS_ALWAYS_EAGER=False)
+    def test_partial_picture(self):
+        """Пока готовы не все варианты, <picture> собирается из готовых,
+        а остальные ставятся в очередь."""
+        post = self.create_post('partial.gif')
+        geometry, options = variant('card', 640, 'JPEG')
+        thumbnail = get_thumbnail(post.image, geometry, **options)
+        picture = ready_picture(post.image, 'card')
+        self.assertEqual(picture.sources, [])
+        self.assertEqual(picture.srcset, f'{thumbnail.url} 640w')
+        self.assertEqual(picture.img.url, thumbnail.url)
+        self.assertTrue(cache.get(f'thumbnail_pending:{post.image.name}'))
+
+    @override_settings(TASKS_ALWAYS_EAGER=False)
+    def test_placeholder_not_cached_after_generation(self):
+        """Построенные миниатюры сбрасывают кеши страниц, успевших
+        показать заглушку."""
+        post = self.create_post('late.gif')
+        author = Client()
+        author.force_login(self.user)
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:profile', args=[self.user.username]),
+            reverse('posts:post_detail', args=[post.pk]),
+        ]
+        etags = {}
+        for url in urls:
+            self.assertNotContains(self.client.get(url), '<picture>')
+            etags[url] = author.get(url)['ETag']
+        generate_thumbnails(post.image.name)
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), '<picture>')
+                response = author.get(url, HTTP_IF_NONE_MATCH=etags[url])
+                self.assertContains(response, '<picture>')
@@ -9,7 +9,7 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
-from ..models import Follow, Group, Post
+from ..models import Comment, Follow, Group, Post
 
 User = get_user_model()
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -232,12 +232,96 @@ class PostViewsTests(TestCase):
     def test_cache_index(self):
         """Проверка кеширования главной страницы index."""
         response1 = self.authorized_client.get(reverse("posts:index"))
+        Post.objects.filter(pk=self.post.pk).update(text='Текст без сигнала')
+        response2 = self.authorized_client.get(reverse("posts:index"))
+        self.assertEqual(response1.content, response2.content)
         Post.objects.create(
             author=self.user,
             text=self.post.text,
         )
-        response2 = self.authorized_client.get(reverse("posts:index"))
-        self.assertEqual(response1.content, response2.content)
-        cache.clear()
         response3 = self.authorized_client.get(reverse("posts:index"))
         self.assertNotEqual(response1.content, response3.content)
+
+    def test_cache_index_group_deleted(self):
+        """Удаление сообщества сбрасывает кеш главной страницы."""
+        group = Group.objects.create(title='Временное', slug='temporary')
+        Post.objects.create(author=self.user, text='Пост', group=group)
+        group_url = reverse('posts:posts_group', args=[group.slug])
+        index = reverse('posts:index')
+        self.assertIn(group_url, self.authorized_client.get(index)
+                      .content.decode())
+        group.delete()
+        self.assertNotIn(group_url, self.authorized_client.get(index)
+                         .content.decode())
+
+    def test_cache_index_variants(self):
+        """Страницы и гостевой вариант главной кешируются отдельно."""
+        for i in range(settings.NUMPOSTS):
+            Post.objects.create(author=self.user, text=f'Пост {i}')
+        index = reverse('posts:index')
+        first = self.authorized_client.get(index)
+        second = self.authorized_client.get(index, {'page': 2})
+        guest = self.client.get(index)
+        self.assertNotEqual(first.content, second.content)
+        self.assertIn(self.post.text, second.content.decode())
+        self.assertNotIn(
+            reverse('posts:follow_index'), guest.content.decode())
+
+
+@override_settings(COMMENTS_PER_PAGE=3)
+class CommentPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.post = Post.objects.create(
+            author=User.objects.create_user(username='Author'), text='Пост')
+        cls.comments = [
+            Comment.objects.create(
+                post=cls.post,
+                author=User.objects.create_user(username=f'Reader{i}'),
+                text=f'Комментарий {i}',
+            )
+            for i in range(7)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def expected(self, start, stop):
+        return list(reversed(self.comments))[start:stop]
+
+    def test_post_detail_shows_first_comments(self):
+        """Страница поста показывает только первую страницу
+        комментариев, авторы загружаются тем же запросом."""
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk]))
+        page = response.context['comments']
+        self.assertEqual(list(page), self.expected(0, 3))
+        self.assertTrue(page.has_next())
+        with self.assertNumQueries(0):
+            [comment.author.username for comment in page]
+
+    def test_fragment_loads_next_comments(self):
+        """Подгрузка отдаёт следующие комментарии без разметки страницы."""
+        first = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk]))
+        cursor = first.context['comments'].next_cursor
+        url = reverse('posts:post_comments', args=[self.post.pk])
+        seen = []
+        while cursor:
+            response = self.client.get(url, {'cursor': cursor})
+            self.assertTemplateUsed(
+                response, 'posts/includes/comment_list.html')
+            self.assertNotContains(response, '<html')
+            page = response.context['comments']
+            seen.extend(page)
+            cursor = page.next_cursor
+        self.assertEqual(seen, self.expected(3, 7))
+
+    def test_new_comment_purges_fragment(self):
+        """Новый комментарий сбрасывает кеш подгрузки."""
+        url = reverse('posts:post_comments', args=[self.post.pk])
+        self.client.get(url)
+        Comment.objects.create(
+            post=self.post, author=self.post.author, text='Свежий')
+        self.assertContains(self.client.get(url), 'Свежий')
@@ -0,0 +1,201 @@
+"""Миниатюры картинок постов, готовящиеся заранее.
+
+sorl создаёт миниатюру при первом {% thumbnail %}, то есть внутри
+рендера чужой страницы. Здесь все пресеты THUMBNAIL_PRESETS строятся
+фоновой задачей после сохранения поста, а шаблоны только ищут готовую
+миниатюру в хранилище ключей sorl.
+
+Каждый пресет строится в нескольких ширинах и форматах THUMBNAIL_FORMATS,
+чтобы браузер по srcset и sizes выбрал самый лёгкий подходящий вариант.
+"""
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import SuspiciousFileOperation
+from django.urls import reverse
+from django.utils import timezone
+from sorl.thumbnail import default, delete, get_thumbnail
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+
+from core.decorators import purge_paths
+from core.tasks import defer
+
+from .conditional import (author_feed, group_feed, group_slug_paths,
+                          post_modified_key)
+from .models import ArchivedPost, Post, StoredImage, post_images
+from .utils import bump_feed_version
+
+
+Picture = namedtuple('Picture', 'sources srcset img sizes')
+
+
+def variant(preset, width, format):
+    """Геометрия и опции sorl для варианта пресета заданной ширины."""
+    geometry, options = settings.THUMBNAIL_PRESETS[preset]
+    size = [int(side) for side in geometry.split('x')]
+    size = [width] + [round(side * width / size[0]) for side in size[1:]]
+    options = dict(options, format=format)
+    options.update(settings.THUMBNAIL_FORMATS[format])
+    return 'x'.join(map(str, size)), options
+
+
+def preset_widths(preset):
+    geometry, _ = settings.THUMBNAIL_PRESETS[preset]
+    largest = int(geometry.split('x')[0])
+    widths = [width for width in settings.THUMBNAIL_WIDTHS if width < largest]
+    return widths + [largest]
+
+
+def aspect_ratio(preset):
+    """Пропорции пресета для CSS aspect-ratio или None, если высота
+    зависит от картинки."""
+    geometry, _ = settings.THUMBNAIL_PRESETS[preset]
+    if 'x' in geometry:
+        return geometry.replace('x', ' / ')
+    return None
+
+
+def generate_thumbnails(name):
+    """Строит все варианты всех пресетов для файла name из хранилища.
+
+    Если какой-то вариант построен только сейчас, страницы с этой
+    картинкой могли закешировать заглушку — их кеши сбрасываются.
+    """
+    source = ImageFile(name, post_images)
+    created = False
+    for preset in settings.THUMBNAIL_PRESETS:
+        for format in settings.THUMBNAIL_FORMATS:
+            for width in preset_widths(preset):
+                geometry, options = variant(preset, width, format)
+                if lookup_thumbnail(source, geometry, options) is None:
+                    get_thumbnail(source, geometry, **options)
+                    created = True
+    if created:
+        purge_image_pages(name)
+
+
+def purge_image_pages(name):
+    """Сбрасывает версии лент, время изменения и гостевой кеш страниц
+    постов с картинкой name."""
+    paths = {reverse('posts:index')}
+    post_ids = []
+    for model in (Post, ArchivedPost):
+        posts = model.objects.filter(image=name)
+        for pk, username, slug in posts.values_list(
+                'pk', 'author__username', 'group__slug'):
+            post_ids.append(pk)
+            bump_feed_version(author_feed(username))
+            paths.add(reverse('posts:post_detail', args=[pk]))
+            paths.add(reverse('posts:profile', args=[username]))
+            if slug is not None:
+                bump_feed_version(group_feed(slug))
+                paths.update(group_slug_paths([slug]))
+        posts.update(updated=timezone.now())
+    bump_feed_version('index')
+    cache.delete_many([post_modified_key(pk) for pk in post_ids])
+    purge_paths(paths)
+
+
+def schedule_thumbnails(name):
+    """Ставит генерацию в фоновый пул, не чаще раза за
+    THUMBNAIL_RETRY_SECONDS для одного файла."""
+    if cache.add(
+            f'thumbnail_pending:{name}', True,
+            settings.THUMBNAIL_RETRY_SECONDS):
+        defer(generate_thumbnails, name)
+
+
+def thumbnail_options(source, options):
+    # Те же значения по умолчанию, что и в ThumbnailBackend.get_thumbnail,
+    # иначе имя файла миниатюры не совпадёт.
+    backend = default.backend
+    options = dict(options)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    return options
+
+
+def lookup_thumbnail(source, geometry, options):
+    name = default.backend._get_thumbnail_filename(
+        source, geometry, thumbnail_options(source, options))
+    return default.kvstore.get(ImageFile(name, default.storage))
+
+
+def ready_thumbnail(image, preset, width=None, format=None):
+    """Готовый вариант пресета или None; сама миниатюра не строится.
+
+    По умолчанию — самый широкий вариант запасного формата. Если
+    миниатюры нет, её генерация ставится в очередь.
+    """
+    if not image:
+        return None
+    width = width or preset_widths(preset)[-1]
+    format = format or list(settings.THUMBNAIL_FORMATS)[-1]
+    thumbnail = lookup_thumbnail(
+        ImageFile(image), *variant(preset, width, format))
+    if thumbnail is None:
+        schedule_thumbnails(image.name)
+    return thumbnail
+
+
+def ready_picture(image, preset):
+    """Готовые варианты пресета для <picture> или None, пока не готов
+    ни один вариант запасного формата.
+
+    Недостающие варианты ставятся в очередь, а страница получает те,
+    что уже есть. Варианты одной ширины (маленький оригинал без
+    увеличения) попадают в srcset один раз.
+    """
+    if not image:
+        return None
+    source = ImageFile(image)
+    srcsets = []
+    missing = False
+    for format in settings.THUMBNAIL_FORMATS:
+        thumbnails = {}
+        for width in preset_widths(preset):
+            thumbnail = lookup_thumbnail(
+                source, *variant(preset, width, format))
+            if thumbnail is None:
+                missing = True
+            else:
+                thumbnails[thumbnail.width] = thumbnail
+        if thumbnails:
+            srcset = ', '.join(
+                f'{thumbnail.url} {width}w'
+                for width, thumbnail in thumbnails.items())
+            srcsets.append((f'image/{format.lower()}', srcset))
+    if missing:
+        schedule_thumbnails(image.name)
+    # Последний формат — запасной для <img>: без него <picture> не собрать.
+    if not thumbnails:
+        return None
+    return Picture(
+        sources=srcsets[:-1],
+        srcset=srcsets[-1][1],
+        img=thumbnails[max(thumbnails)],
+        sizes=settings.THUMBNAIL_SIZES,
+    )
+
+
+def delete_image(name):
+    """Удаляет файл картинки поста, его миниатюры и записи sorl, если
+    файл не успели загрузить заново."""
+    if StoredImage.objects.filter(name=name).exists():
+        return
+    try:
+        post_images.path(name)
+    except SuspiciousFileOperation:
+        # Имя вне MEDIA_ROOT (например, абсолютный путь из импорта) —
+        # такой файл хранилищу не принадлежит.
+        return
+    delete(ImageFile(name, post_images))
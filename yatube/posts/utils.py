@@ -1,9 +1,282 @@
+import base64
+import binascii
+import time
+
 from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
 from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from core.routers import primary_reads
+
+
+def feed_count_key(feed, pk=None):
+    """Ключ кеша с числом постов ленты: all, group, author, follower."""
+    if pk is None:
+        return f'feed_count:{feed}'
+    return f'feed_count:{feed}:{pk}'
+
+
+def feed_version(feed):
+    """Версия закешированных страниц ленты; меняется при каждой записи."""
+    key = f'feed_version:{feed}'
+    version = cache.get(key)
+    if version is None:
+        # После вытеснения ключа версия не должна совпасть со старой.
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_feed_version(feed):
+    try:
+        cache.incr(f'feed_version:{feed}')
+    except ValueError:
+        feed_version(feed)
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator, берущий общее число записей ленты из кеша.
+
+    Значение в кеше поддерживают обработчики сигналов из posts.signals,
+    поэтому COUNT(*) выполняется только при промахе кеша.
+    """
+
+    def __init__(self, object_list, per_page, count_key, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_key = count_key
+
+    @cached_property
+    def count(self):
+        count = cache.get(self.count_key)
+        if count is None:
+            with primary_reads():
+                count = self.object_list.count()
+            cache.add(self.count_key, count, settings.FEED_COUNT_TIMEOUT)
+        return count
+
+
+class ChainedFeed:
+    """Лента из горячих постов и архива как один упорядоченный список.
+
+    Архив содержит только посты старше горячих, поэтому при сортировке
+    по убыванию даты архив продолжает горячую часть, а не смешивается
+    с ней. К архиву обращаются, только когда горячих строк не хватило.
+    """
+    ordered = True
+
+    def __init__(self, hot, archive, descending=True):
+        self.hot = hot
+        self.archive = archive
+        self.descending = descending
+
+    @property
+    def model(self):
+        return self.hot.model
+
+    def _clone(self, method, *args, **kwargs):
+        return ChainedFeed(
+            getattr(self.hot, method)(*args, **kwargs),
+            getattr(self.archive, method)(*args, **kwargs),
+            self.descending,
+        )
+
+    def filter(self, *args, **kwargs):
+        return self._clone('filter', *args, **kwargs)
+
+    def order_by(self, *fields):
+        feed = self._clone('order_by', *fields)
+        feed.descending = not fields or fields[0].startswith('-')
+        return feed
+
+    @property
+    def parts(self):
+        if self.descending:
+            return self.hot, self.archive
+        return self.archive, self.hot
+
+    @cached_property
+    def _count(self):
+        return sum(part.count() for part in self.parts)
+
+    def count(self):
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __iter__(self):
+        for part in self.parts:
+            yield from part
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        if index.step is not None or index.stop is None:
+            raise ValueError('ChainedFeed поддерживает только срезы [a:b].')
+        return ChainedSlice(self, index.start or 0, index.stop)
+
+    def rows(self, start, stop):
+        first, second = self.parts
+        rows = list(first[start:stop])
+        if len(rows) == stop - start:
+            return rows
+        if rows or not start:
+            first_count = start + len(rows)
+        else:
+            first_count = first.count()
+        return rows + list(second[
+            max(start - first_count, 0):stop - first_count])
+
+
+class ChainedSlice:
+    """Срез ChainedFeed: как и срез QuerySet, читается из базы при первом
+    обращении, поэтому закешированный фрагмент шаблона его не выполняет."""
+
+    def __init__(self, feed, start, stop):
+        self.feed = feed
+        self.start = start
+        self.stop = stop
+
+    @cached_property
+    def object_list(self):
+        return self.feed.rows(self.start, self.stop)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+
+class CursorPage:
+    """Страница keyset-пагинации: без COUNT(*) и OFFSET."""
+    is_cursor = True
+
+    def __init__(self, object_list, paginator,
+                 next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self.object_list)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Пагинация по ключу (field, pk) с непрозрачными курсорами.
+
+    Курсор хранит направление и ключ крайней записи страницы, поэтому
+    каждая страница — один запрос по индексу поля `field`.
+    """
+    NEXT = 'n'
+    PREVIOUS = 'p'
+
+    def __init__(self, queryset, per_page, field='pub_date', descending=True):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.field = field
+        self.descending = descending
+
+    def encode_cursor(self, obj, direction):
+        value = getattr(obj, self.field)
+        if hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        raw = f'{direction}|{value}|{obj.pk}'
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """Возвращает (направление, значение поля, pk) или None."""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            raw = base64.urlsafe_b64decode(padded.encode()).decode()
+            head, pk = raw.rsplit('|', 1)
+            direction, value = head.split('|', 1)
+            opts = self.queryset.model._meta
+            value = opts.get_field(self.field).to_python(value)
+            pk = opts.pk.to_python(pk)
+        except (ValueError, TypeError, binascii.Error, ValidationError):
+            return None
+        if direction not in (self.NEXT, self.PREVIOUS) or value is None:
+            return None
+        return direction, value, pk
+
+    def _ordered(self, direction):
+        forward = (direction == self.NEXT) == self.descending
+        prefix = '-' if forward else ''
+        return self.queryset.order_by(f'{prefix}{self.field}', f'{prefix}pk')
+
+    def _after(self, queryset, direction, value, pk):
+        before = (direction == self.NEXT) == self.descending
+        op = 'lt' if before else 'gt'
+        return queryset.filter(
+            Q(**{f'{self.field}__{op}': value})
+            | Q(**{self.field: value, f'pk__{op}': pk})
+        )
+
+    def get_page(self, cursor=None):
+        """Возвращает страницу по курсору; битый курсор — первая страница."""
+        decoded = self.decode_cursor(cursor) if cursor else None
+        direction = decoded[0] if decoded else self.NEXT
+        queryset = self._ordered(direction)
+        if decoded:
+            queryset = self._after(queryset, *decoded)
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == self.PREVIOUS:
+            if not has_more:
+                # Дошли до начала ленты: отдаём обычную первую страницу.
+                return self.get_page()
+            rows.reverse()
+        if not rows:
+            return CursorPage(rows, self)
+        next_cursor = previous_cursor = None
+        if has_more or direction == self.PREVIOUS:
+            next_cursor = self.encode_cursor(rows[-1], self.NEXT)
+        if decoded:
+            previous_cursor = self.encode_cursor(rows[0], self.PREVIOUS)
+        return CursorPage(rows, self, next_cursor, previous_cursor)
 
 
-def get_page_context(queryset, request):
-    paginator = Paginator(queryset, settings.NUMPOSTS)
+def get_page_context(queryset, request, count_key=None, paginator=None):
+    cursor = request.GET.get('cursor')
+    if cursor is not None or settings.FEED_PAGINATION == 'cursor':
+        paginator = CursorPaginator(queryset, settings.NUMPOSTS)
+        return {
+            'cursor': cursor,
+            'page_obj': paginator.get_page(cursor),
+        }
+    if paginator is None:
+        if count_key is None:
+            paginator = Paginator(queryset, settings.NUMPOSTS)
+        else:
+            paginator = CachedCountPaginator(
+                queryset, settings.NUMPOSTS, count_key)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return {
@@ -1,28 +1,80 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.views.decorators.http import condition, require_POST
 
-from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
-from .utils import get_page_context
+from core.decorators import anonymous_page_cache, replica_reads
+from core.middleware import pin_primary
 
+from .archive import get_post, with_archive
+from .conditional import (group_etag, index_etag, post_etag,
+                          post_last_modified, profile_etag)
+from .feeds import feed_queryset, follow_feed_paginator
+from .follows import follow_authors, follow_states, unfollow_authors
+from .forms import (CommentForm, FollowBulkForm, PostForm, SearchForm,
+                    UsernamesForm)
+from .graph import get_suggestions
+from .models import ArchivedPost, Follow, Group, Post, User
+from .search import SearchPaginator, search_posts
+from .utils import (CursorPaginator, feed_count_key, feed_version,
+                    get_page_context)
 
+
+# Без replica_reads: лента целиком во фрагменте {% cache %}, и при
+# промахе он заполнялся бы с отставшей реплики.
+@condition(etag_func=index_etag)
+@anonymous_page_cache
 def index(request):
-    context = get_page_context(Post.objects.all(), request)
+    context = {
+        'cache_timeout': settings.FEED_CACHE_TIMEOUT,
+        'cache_version': feed_version('index'),
+    }
+    context.update(get_page_context(
+        with_archive(Post.objects.all(), ArchivedPost.objects.all()),
+        request,
+        feed_count_key('all'),
+    ))
     return render(request, 'posts/index.html', context)
 
 
+@replica_reads
+@condition(etag_func=group_etag)
+@anonymous_page_cache
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
+    group = get_object_or_404(
+        Group.objects.select_related('stats'), slug=slug)
     context = {
         'group': group,
     }
-    context.update(get_page_context(group.posts.all(), request))
+    context.update(get_page_context(
+        with_archive(group.posts.all(), group.archived_posts.all()),
+        request,
+        feed_count_key('group', group.pk),
+    ))
     return render(request, 'posts/group_list.html', context)
 
 
+@replica_reads
+@anonymous_page_cache
+def group_index(request):
+    """Каталог сообществ по названию: превью и число постов
+    берутся из GroupStats тем же запросом, что и страница."""
+    groups = Group.objects.select_related('stats')
+    paginator = CursorPaginator(
+        groups, settings.GROUPS_PER_PAGE, field='title', descending=False)
+    context = {
+        'page_obj': paginator.get_page(request.GET.get('cursor')),
+    }
+    return render(request, 'posts/groups.html', context)
+
+
+@replica_reads
+@condition(etag_func=profile_etag)
+@anonymous_page_cache
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    following_count = author.following.count()
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username)
     following = (request.user.is_authenticated
                  and Follow.objects.filter(
                      user=request.user,
@@ -31,26 +83,79 @@ def profile(request, username):
     context = {
         'author': author,
         'following': following,
-        'following_count': following_count,
+        'suggestions': (
+            get_suggestions(request.user.pk)
+            if request.user.is_authenticated else ()),
     }
-    context.update(get_page_context(author.posts.all(), request))
+    context.update(get_page_context(
+        with_archive(author.posts.all(), author.archived_posts.all()),
+        request,
+        feed_count_key('author', author.pk),
+    ))
     return render(request, 'posts/profile.html', context)
 
 
+def get_comments_page(post, request):
+    """Страница комментариев поста по курсору (created, id)."""
+    comments = post.comments.select_related(
+        'author').only('text', 'created', 'author__username')
+    paginator = CursorPaginator(
+        comments, settings.COMMENTS_PER_PAGE, field='created')
+    return paginator.get_page(request.GET.get('cursor'))
+
+
+@replica_reads
+@condition(etag_func=post_etag, last_modified_func=post_last_modified)
+@anonymous_page_cache
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    comment = post.comments.all()
+    post = get_post(post_id, related=('author__stats', 'group'))
+    if post is None:
+        raise Http404
     form = CommentForm(request.POST or None)
     author = post.author
     context = {
         'post': post,
-        'comments': comment,
+        'comments': get_comments_page(post, request),
         'form': form,
         'author': author,
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@replica_reads
+@condition(etag_func=post_etag, last_modified_func=post_last_modified)
+@anonymous_page_cache
+def post_comments(request, post_id):
+    post = get_post(post_id)
+    if post is None:
+        raise Http404
+    context = {
+        'post': post,
+        'comments': get_comments_page(post, request),
+    }
+    return render(request, 'posts/includes/comment_list.html', context)
+
+
+@replica_reads
+def search(request):
+    form = SearchForm(request.GET or None)
+    context = {'form': form}
+    if form.is_valid():
+        posts = feed_queryset(Post.objects.all())
+        if form.cleaned_data['group']:
+            posts = posts.filter(group=form.cleaned_data['group'])
+        if form.cleaned_data['author']:
+            posts = posts.filter(
+                author__username=form.cleaned_data['author'])
+        paginator = SearchPaginator(
+            search_posts(posts, form.cleaned_data['q']), settings.NUMPOSTS)
+        context['page_obj'] = paginator.get_page(request.GET.get('cursor'))
+        query = request.GET.copy()
+        query.pop('cursor', None)
+        context['query'] = query.urlencode()
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request):
     template = 'posts/create_post.html'
@@ -101,9 +206,12 @@ def add_comment(request, post_id):
 
 
 @login_required
+@condition(etag_func=index_etag)
 def follow_index(request):
-    post_list = Post.objects.filter(author__following__user=request.user)
-    context = get_page_context(post_list, request)
+    paginator = follow_feed_paginator(request.user)
+    context = get_page_context(
+        paginator.object_list, request, paginator=paginator)
+    context['suggestions'] = get_suggestions(request.user.pk)
     return render(request, 'posts/follow.html', context)
 
 
@@ -113,6 +221,8 @@ def profile_follow(request, username):
     user = request.user
     if user != author:
         Follow.objects.get_or_create(user=user, author=author)
+        # GET с записью: профиль после редиректа читает основную базу.
+        pin_primary(request)
         return redirect('posts:profile', username=author)
     return redirect('posts:profile', username=author.username)
 
@@ -121,6 +231,40 @@ def profile_follow(request, username):
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
     Follow.objects.filter(user=request.user, author=author).delete()
+    pin_primary(request)
     return redirect('posts:profile', username=username)
 
 
+@login_required
+@require_POST
+def follow_bulk(request):
+    """Подписка или отписка от пачки авторов одной транзакцией."""
+    form = FollowBulkForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    usernames = form.cleaned_data['usernames']
+    authors = dict(User.objects.filter(username__in=usernames).exclude(
+        pk=request.user.pk).values_list('pk', 'username'))
+    if form.cleaned_data['action'] == 'follow':
+        changed = follow_authors(request.user, authors)
+    else:
+        changed = unfollow_authors(request.user, authors)
+    known = {*authors.values(), request.user.username}
+    return JsonResponse({
+        'changed': sorted(authors[author_id] for author_id in changed),
+        # На себя подписаться нельзя: своё имя не считается неизвестным.
+        'skipped': [
+            name for name in usernames if name == request.user.username],
+        'unknown': [name for name in usernames if name not in known],
+    })
+
+
+@login_required
+@replica_reads
+def follow_state(request):
+    """Подписан ли пользователь на каждого из авторов — один запрос."""
+    form = UsernamesForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    return JsonResponse(
+        follow_states(request.user, form.cleaned_data['usernames']))
@@ -45,6 +45,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.PrimaryPinMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
@@ -76,7 +77,31 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+    },
+    # Локальная реплика; данные копирует команда sync_replica
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db_replica.sqlite3'),
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+# Реплики для чтения лент, например ['replica']; пустой список —
+# всё читается из основной базы
+DATABASE_REPLICAS = []
+# После записи клиент читает из основной базы, пока не догонят реплики
+REPLICA_PIN_COOKIE = 'pin_primary'
+REPLICA_PIN_SECONDS = 10
+# Применяются к каждому соединению SQLite (core.db.configure_sqlite):
+# WAL не блокирует читателей на время записи, ожидание блокировки
+# вместо немедленной ошибки «database is locked»
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,  # В КиБ: 64 МиБ
+    'temp_store': 'MEMORY',
 }
 
 
@@ -124,11 +149,93 @@ LOGIN_REDIRECT_URL = 'posts:index'
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 NUMPOSTS = 10  # Количество выводимых постов на страницах
+COMMENTS_PER_PAGE = 20  # Комментариев на странице поста и в подгрузке
+GROUPS_PER_PAGE = 50  # Сообществ на странице каталога
+# Режим пагинации лент: 'page' — номера страниц, 'cursor' — keyset-курсоры
+FEED_PAGINATION = 'page'
+FEED_COUNT_TIMEOUT = 60 * 60 * 24  # Время жизни счётчиков постов в лентах
+FEED_CACHE_TIMEOUT = 60 * 60  # Время жизни закешированных страниц главной
+# Авторы с большим числом подписчиков не раскладываются по лентам,
+# их посты подмешиваются в ленту подписок при чтении
+FEED_FANOUT_MAX_FOLLOWERS = 10000
+FEED_FANOUT_BATCH = 1000
+FEED_PROLIFIC_TIMEOUT = 60 * 5
+# Кешированные списки последних постов авторов для первых страниц
+# ленты подписок
+FEED_RING_SIZE = 50
+FEED_RING_TIMEOUT = 60 * 60
+# Посты старше ARCHIVE_AFTER_DAYS дней команда archive_posts переносит
+# в архивные таблицы
+ARCHIVE_AFTER_DAYS = 365
+ARCHIVE_BATCH_SIZE = 500
+# Рекомендации «кого почитать»: сколько хранить и показывать на странице;
+# подписки авторов, подписанных больше чем на MAX_DEGREE человек,
+# в расчёте не участвуют
+FOLLOW_SUGGESTIONS_COUNT = 20
+FOLLOW_SUGGESTIONS_SHOWN = 5
+FOLLOW_SUGGESTIONS_MAX_DEGREE = 1000
+FOLLOW_SUGGESTIONS_TIMEOUT = 60 * 60
+FOLLOW_BULK_MAX = 100  # Авторов в одном запросе пакетной подписки
+# Фоновые задачи: в режиме разработки выполняются сразу
+BACKGROUND_WORKERS = 4
+TASKS_ALWAYS_EAGER = DEBUG
+# Миниатюры картинок постов строятся фоновой задачей после сохранения
+# поста; шаблоны берут их по имени пресета: (геометрия, опции sorl).
+# Геометрия задаёт самый широкий вариант, остальные — ширины из
+# THUMBNAIL_WIDTHS меньше неё с теми же пропорциями
+THUMBNAIL_PRESETS = {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+    'full': ('1280', {'upscale': False}),
+}
+THUMBNAIL_WIDTHS = (320, 640, 960)
+# Форматы вариантов по убыванию предпочтения: все, кроме последнего,
+# идут в <source>, последний — запасной для <img>
+THUMBNAIL_FORMATS = {
+    'WEBP': {'quality': 80},
+    'JPEG': {'quality': 85},
+}
+# Ширина картинки на экране для атрибута sizes: колонка .container
+THUMBNAIL_SIZES = (
+    '(min-width: 1200px) 1110px, (min-width: 992px) 930px, '
+    '(min-width: 768px) 690px, (min-width: 576px) 510px, 100vw'
+)
+# Как часто рендер может заново поставить генерацию недостающей миниатюры
+THUMBNAIL_RETRY_SECONDS = 60
+# Метаданные миниатюр: LRU процесса перед кешем, база — только при промахе
+THUMBNAIL_KVSTORE = 'core.kvstore.KVStore'
+THUMBNAIL_LRU_SIZE = 10000
+THUMBNAIL_LRU_TIMEOUT = 60
+# Загрузки всегда пишутся во временный файл, а не в память процесса
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+# Картинки постов: размер файла, сколько пикселей можно декодировать
+# (JPEG сначала уменьшается декодером), длинная сторона и качество
+# после перекодирования
+IMAGE_UPLOAD_MAX_SIZE = 20 * 2 ** 20
+IMAGE_MAX_PIXELS = 16_000_000
+IMAGE_MAX_SIDE = 2560
+IMAGE_QUALITY = 85
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Раздача MEDIA (см. core/media.py): None — отдаёт веб-сервер,
+# 'x-accel-redirect' — nginx по заголовку из internal-location
+# MEDIA_ACCEL_PREFIX, 'x-sendfile' — Apache/lighttpd, 'stream' — Django
+MEDIA_SERVE = 'stream'
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+# Миниатюры sorl не меняются под тем же именем — кешируются навсегда
+MEDIA_IMMUTABLE_PREFIXES = ('cache/',)
+MEDIA_MAX_AGE = 60 * 60
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
+# Гостевые страницы кешируются целиком; просроченный ответ ещё
+# ANONYMOUS_CACHE_STALE секунд отдаётся, пока страница пересобирается
+ANONYMOUS_CACHE_TIMEOUT = 60
+ANONYMOUS_CACHE_STALE = 60 * 10
+ANONYMOUS_CACHE_LOCK_TIMEOUT = 30
+# Время жизни валидаторов ETag/Last-Modified страниц постов
+CONDITIONAL_CACHE_TIMEOUT = 60 * 60
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'